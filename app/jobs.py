@@ -0,0 +1,55 @@
+"""
+Background categorization jobs shared by the Streamlit front ends
+(streamlit_app.py and ui.py).
+"""
+import os
+import pandas as pd
+import streamlit as st
+from src.categorize import JobCache
+
+# Larger results are not offered as an in-browser download, which would
+# hold the whole file in memory
+DOWNLOAD_LIMIT = 200 * 1024 * 1024
+
+@st.cache_resource
+def get_job_cache():
+    # Shared by every session and rerun; results are kept on disk by file hash
+    return JobCache("data/jobs", chunk_size=10000)
+
+@st.fragment(run_every=0.5)
+def show_progress(job):
+    """
+    Progress bar of a running job. Only this fragment reruns while the job
+    is going, so the rest of the page stays interactive; once the job is
+    done the whole script reruns to show the result.
+    """
+    if job.done:
+        st.rerun()
+    total = f" of ~{job.total_rows:,}" if job.total_rows else ""
+    st.progress(job.progress, text=f"Categorized {job.rows:,}{total} rows")
+
+def show_job(job):
+    """
+    Progress of a background categorization job, then a preview and a
+    download of its results.
+    """
+    if not job.done:
+        if st.button("Cancel"):
+            job.cancel()
+        show_progress(job)
+        return
+
+    if job.status == "failed":
+        st.error(f"Processing failed: {job.error}")
+    elif job.status == "cancelled":
+        st.warning("Processing cancelled.")
+    elif job.status == "done":
+        if job.started_at:
+            st.success(f"Categorized {job.rows:,} rows in {job.finished_at - job.started_at:.1f}s")
+        st.dataframe(pd.read_csv(job.output_path, nrows=1000))
+        size = os.path.getsize(job.output_path)
+        if size > DOWNLOAD_LIMIT:
+            st.info(f"The results ({size / 1024**2:,.0f} MB) are too large to download here; they are at {job.output_path}")
+        else:
+            with open(job.output_path, "rb") as f:
+                st.download_button("Download Results", f, "categorized_transactions.csv", "text/csv", key="download-csv")
@@ -1,29 +1,340 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, Response, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
 import os
+import threading
+import time
+import hashlib
+import json
+import yaml
 from src.model import TransactionClassifier
 from src.explainability import Explainer
-from src.data_generator import load_config
+from src.cache import PredictionCache
+from src.batching import MicroBatcher
+from src.online import OnlineLearner
+from src.feedback import FeedbackStore
+from src.keywords import KeywordMatcher
+from src.neighbors import NeighborIndex, NeighborFallback
+from src.reloader import Reloader
+from src.metrics import REGISTRY, STAGE_SECONDS, SIZE_BUCKETS, Counter, Histogram, CallbackMetric
+from src.profiler import SamplingProfiler
+from src.categorize import read_stream_records, parse_records, categorize_chunks, format_frame, MEDIA_TYPES
+from src import columnar
 
 app = FastAPI(title="Transaction Categorization API")
 
+# Pickled pipeline, or a directory or .tcm file exported by src/model_store.py
+# whose arrays are memory-mapped and shared by all worker processes
+MODEL_PATH = os.environ.get("MODEL_PATH", "models/model.pkl")
+CONFIG_PATH = os.environ.get("CONFIG_PATH", "config/categories.yaml")
+
+# Seconds between checks of MODEL_PATH and CONFIG_PATH for changes, which are
+# loaded and swapped in without a restart (0 disables it)
+RELOAD_INTERVAL = float(os.environ.get("RELOAD_INTERVAL", 5))
+
+def read_config():
+    with open(CONFIG_PATH, 'rb') as f:
+        data = f.read()
+    return yaml.safe_load(data), hashlib.sha256(data).hexdigest()[:16]
+
 # Global models
 classifier = TransactionClassifier()
 explainer = None
-config = load_config()
+# Request handlers read the (classifier, explainer) pair in one step, so a
+# swap never pairs a model with another model's explainer
+serving = (classifier, explainer)
+# Held while the served model, the cache version and the online learner change
+swap_lock = threading.RLock()
+config, config_version = read_config()
+versions = {
+    "model": None, "model_loaded_at": None,
+    "config": config_version, "config_loaded_at": time.time(),
+}
+reloader = None
+
+# Rows per vectorized inference call in /predict_batch
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 10000))
+
+# Results keyed on normalized description + model version (TTL in seconds, 0 disables it)
+prediction_cache = PredictionCache(
+    max_size=int(os.environ.get("PREDICTION_CACHE_SIZE", 100000)),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 0)) or None
+)
+
+# Async serving: coalesce concurrent /predict calls into micro-batches
+ASYNC_SERVING = os.environ.get("ASYNC_SERVING", "0") == "1"
+MICROBATCH_WINDOW_MS = float(os.environ.get("MICROBATCH_WINDOW_MS", 2.0))
+MICROBATCH_MAX_SIZE = int(os.environ.get("MICROBATCH_MAX_SIZE", 256))
+batcher = None
+
+# Online learning: fold /feedback corrections into the live model in mini-batches
+# (needs a model with partial_fit, e.g. `python src/model.py --vectorizer hashing --estimator sgd`)
+ONLINE_LEARNING = os.environ.get("ONLINE_LEARNING", "0") == "1"
+ONLINE_BATCH_SIZE = int(os.environ.get("ONLINE_BATCH_SIZE", 32))
+# Each update swaps the model and so empties the prediction cache; updates are
+# applied on a background thread at most once per ONLINE_UPDATE_INTERVAL seconds
+ONLINE_UPDATE_INTERVAL = float(os.environ.get("ONLINE_UPDATE_INTERVAL", 60))
+online_learner = None
+
+# Descriptions naming a known merchant from categories.yaml skip the model
+# (opt-in; recompiled automatically when the file changes)
+KEYWORD_FAST_PATH = os.environ.get("KEYWORD_FAST_PATH", "0") == "1"
+keyword_matcher = KeywordMatcher(CONFIG_PATH) if KEYWORD_FAST_PATH else None
+
+# Score with the float32 kernel of src/scoring.py instead of sklearn's
+# predict_proba, dropping features whose weights are all within SCORING_PRUNE
+# of zero (`python -m src.scoring --tolerance ...` finds the largest safe value)
+SCORING_KERNEL = os.environ.get("SCORING_KERNEL", "0") == "1"
+SCORING_PRUNE = float(os.environ.get("SCORING_PRUNE", 0))
+
+# Predictions below NEIGHBOR_CONFIDENCE are matched against the nearest-merchant
+# index built by `python -m src.neighbors` (needs sentence-transformers)
+NEIGHBOR_FALLBACK = os.environ.get("NEIGHBOR_FALLBACK", "0") == "1"
+NEIGHBOR_INDEX = os.environ.get("NEIGHBOR_INDEX", "models/merchant_index.npz")
+NEIGHBOR_CONFIDENCE = float(os.environ.get("NEIGHBOR_CONFIDENCE", 0.6))
+NEIGHBOR_MIN_SIMILARITY = float(os.environ.get("NEIGHBOR_MIN_SIMILARITY", 0.8))
+# Embeddings kept in memory in front of models/embeddings.db, and rows kept in it
+NEIGHBOR_MEMORY_CACHE = int(os.environ.get("NEIGHBOR_MEMORY_CACHE", 10000))
+NEIGHBOR_CACHE_ROWS = int(os.environ.get("NEIGHBOR_CACHE_ROWS", 1000000))
+neighbor_fallback = None
+
+# Sampling profiler that /profiler/start and /profiler/stop switch on and off
+# at runtime (the endpoints are only exposed when this is set)
+PROFILER_ENDPOINTS = os.environ.get("PROFILER_ENDPOINTS", "0") == "1"
+profiler = SamplingProfiler()
+
+# Corrections are queued and written in batches by a background thread
+feedback_store = FeedbackStore(os.environ.get("FEEDBACK_DB", "data/feedback.db"))
+# Seconds /feedback waits for its correction to be written
+FEEDBACK_TIMEOUT = float(os.environ.get("FEEDBACK_TIMEOUT", 10))
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["method", "path"]
+))
+REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by status.", ["method", "path", "status"]
+))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "prediction_batch_size", "Descriptions per prediction call.", buckets=SIZE_BUCKETS
+))
+PREDICTIONS = REGISTRY.register(Counter(
+    "predictions_total", "Distinct descriptions answered, by source (keyword, cache, model).", ["source"]
+))
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (BaseHTTPMiddleware costs far more per request)
+    recording latency and status per route template, so paths with
+    parameters do not create a series each.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            path = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], path)
+            REQUESTS.inc(1, scope["method"], path, str(status[0]))
+
+app.add_middleware(MetricsMiddleware)
+
+def json_response(content):
+    """
+    Serializes like FastAPI's JSONResponse, timed as the "serialize" stage.
+    """
+    start = time.perf_counter()
+    body = json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"))
+    STAGE_SECONDS.observe(time.perf_counter() - start, "serialize")
+    return Response(body, media_type="application/json")
+
+def check_columnar_format(fmt):
+    if fmt not in columnar.MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    # Reported here, before the body is parsed, rather than as a parse error
+    missing = columnar.missing_dependency(fmt)
+    if missing:
+        raise HTTPException(status_code=501, detail=f"The {fmt} format needs {missing}, which is not installed (pip install {missing})")
+
+def columnar_response(preds, model, fmt):
+    """
+    Predictions as parallel columns in `fmt` (see src/columnar.py), timed as
+    the "serialize" stage.
+    """
+    start = time.perf_counter()
+    classes = model.pipeline.classes_.tolist() if model.pipeline is not None else ()
+    body = columnar.write_columns(*columnar.to_columns(preds, classes), fmt)
+    STAGE_SECONDS.observe(time.perf_counter() - start, "serialize")
+    return Response(body, media_type=columnar.MEDIA_TYPES[fmt])
 
 @app.on_event("startup")
 def load_models():
-    global classifier, explainer
-    model_path = "models/model.pkl"
-    if os.path.exists(model_path):
-        classifier.load_model(model_path)
-        explainer = Explainer(model_path)
+    if os.path.exists(MODEL_PATH):
+        reload_model()
     else:
         print("Model not found. Please train the model first.")
 
+def reload_model():
+    """
+    Loads MODEL_PATH and warms the new model up before swapping it in, so no
+    request waits on a cold model. Does nothing if the content is unchanged.
+    """
+    global online_learner
+    new_classifier = TransactionClassifier()
+    new_classifier.load_model(MODEL_PATH)
+    if new_classifier.version == versions["model"]:
+        return
+
+    new_explainer = Explainer(pipeline=new_classifier.pipeline)
+    # First calls page in memory-mapped arrays and fill lazy caches
+    warmup = [keyword for category in config["categories"] for keyword in category["keywords"][:2]]
+    inference = new_classifier.infer(warmup, return_features=True)
+    new_explainer.explain_batch(
+        warmup, top_k=5, features=inference.features,
+        class_indices=inference.probabilities.argmax(axis=1)
+    )
+
+    learner = None
+    if ONLINE_LEARNING:
+        if OnlineLearner.supports(new_classifier):
+            # Online updates continue from the newly deployed model
+            learner = OnlineLearner(
+                new_classifier, batch_size=ONLINE_BATCH_SIZE, min_interval=ONLINE_UPDATE_INTERVAL,
+                on_update=lambda updated: apply_online_update(learner, updated)
+            )
+        else:
+            print("Online learning disabled: the loaded model does not support partial_fit.")
+
+    # The old learner is retired in the same step, so an update it is still
+    # computing can no longer be swapped in over the new model
+    with swap_lock:
+        swap_model(new_classifier, new_explainer)
+        versions["model"] = new_classifier.version
+        versions["model_loaded_at"] = time.time()
+        previous, online_learner = online_learner, learner
+    print(f"Serving model {new_classifier.version} from {MODEL_PATH}")
+
+    # Outside the lock: the old learner's worker may be waiting on it
+    if previous:
+        previous.stop()
+    if learner:
+        learner.start()
+
+def apply_online_update(learner, updated):
+    with swap_lock:
+        # Unless a newly deployed model replaced the learner's in the meantime
+        if learner is online_learner:
+            swap_model(updated)
+
+def reload_config():
+    global config
+    config, versions["config"] = read_config()
+    versions["config_loaded_at"] = time.time()
+    if keyword_matcher:
+        keyword_matcher.compile()
+    print(f"Loaded categories {versions['config']} from {CONFIG_PATH}")
+
+def swap_model(new_classifier, new_explainer=None):
+    """
+    Replaces the serving model without a restart. In-flight requests finish
+    on the model they started with.
+    """
+    global classifier, explainer, serving
+    if SCORING_KERNEL and new_classifier.scorer is None:
+        new_classifier.compile_scoring(prune=SCORING_PRUNE)
+    if new_explainer is None:
+        new_explainer = Explainer(pipeline=new_classifier.pipeline)
+    # The model and the cache version change together, whichever thread
+    # (reloader or online learner) swaps
+    with swap_lock:
+        serving = (new_classifier, new_explainer)
+        classifier, explainer = serving
+        prediction_cache.set_version(new_classifier.version)
+
+@app.on_event("startup")
+def load_neighbor_index():
+    global neighbor_fallback
+    if not NEIGHBOR_FALLBACK:
+        return
+    if not os.path.exists(NEIGHBOR_INDEX):
+        print(f"Nearest-merchant fallback disabled: {NEIGHBOR_INDEX} not found. Build it with `python -m src.neighbors`.")
+        return
+    # Disk cache writes happen on a background thread, not in requests
+    index = NeighborIndex.load(
+        NEIGHBOR_INDEX, memory_size=NEIGHBOR_MEMORY_CACHE, defer_writes=True, cache_rows=NEIGHBOR_CACHE_ROWS
+    )
+    try:
+        # Loads the embedding model now instead of on the first unsure request
+        index.search(["warmup"])
+    except ImportError as e:
+        print(f"Nearest-merchant fallback disabled: {e}")
+        return
+    neighbor_fallback = NeighborFallback(index, NEIGHBOR_CONFIDENCE, NEIGHBOR_MIN_SIMILARITY)
+    print(f"Nearest-merchant fallback over {len(index.labels)} descriptions from {NEIGHBOR_INDEX}")
+
+@app.on_event("shutdown")
+def flush_neighbor_embeddings():
+    if neighbor_fallback:
+        neighbor_fallback.index.embedder.flush()
+
+@app.on_event("startup")
+def start_reloader():
+    global reloader
+    if RELOAD_INTERVAL > 0:
+        reloader = Reloader(RELOAD_INTERVAL)
+        reloader.watch(MODEL_PATH, reload_model)
+        reloader.watch(CONFIG_PATH, reload_config)
+        reloader.start()
+
+@app.on_event("shutdown")
+def stop_reloader():
+    if reloader:
+        reloader.stop()
+
+@app.on_event("startup")
+def start_feedback_store():
+    feedback_store.start()
+
+@app.on_event("shutdown")
+def stop_feedback_store():
+    feedback_store.close(timeout=FEEDBACK_TIMEOUT)
+
+@app.on_event("shutdown")
+def stop_online_learner():
+    if online_learner:
+        online_learner.stop()
+
+@app.on_event("startup")
+async def start_batcher():
+    global batcher
+    if ASYNC_SERVING:
+        batcher = MicroBatcher(
+            lambda descriptions: predict_cached(descriptions, explain=True),
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch=MICROBATCH_MAX_SIZE
+        )
+        await batcher.start()
+
+@app.on_event("shutdown")
+async def stop_batcher():
+    if batcher:
+        await batcher.stop()
+
 class TransactionRequest(BaseModel):
     description: str
     amount: Optional[float] = None
@@ -32,47 +343,215 @@ class PredictionResponse(BaseModel):
     category: str
     confidence: float
     explanation: List[dict]
+    keywords: Optional[List[str]] = None
+
+def predict_cached(descriptions, explain=False):
+    """
+    Prediction results for a list of descriptions, served from the keyword
+    fast path or the cache where possible. Descriptions that normalize to the
+    same text are inferred once and the result is fanned back out to every row.
+    Low-confidence model predictions go through the nearest-merchant fallback.
+    """
+    # Local references, so a model swap mid-request does not change models halfway through
+    model, model_explainer = serving
+    fallback = neighbor_fallback
+    explain = explain and model_explainer is not None
+    BATCH_SIZE.observe(len(descriptions))
+    
+    start = time.perf_counter()
+    keys = [prediction_cache.key(description, model.version) for description in descriptions]
+    unique = list(dict.fromkeys(keys))
+    STAGE_SECONDS.observe(time.perf_counter() - start, "normalize")
+    
+    # The key already holds the normalized text
+    if keyword_matcher:
+        start = time.perf_counter()
+        matches = keyword_matcher.match_batch([key[1] for key in unique], normalized=True)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "keyword_match")
+    else:
+        matches = [None] * len(unique)
+    
+    start = time.perf_counter()
+    results = {}
+    pending = []
+    for key, match in zip(unique, matches):
+        if match is not None:
+            category, keywords = match
+            result = {"category": category, "confidence": 1.0}
+            if explain:
+                # No model ran, so there are no attributions; the matched
+                # keywords are reported on their own instead
+                result["explanation"] = []
+                result["keywords"] = keywords
+            results[key] = result
+            continue
+        cached = prediction_cache.get(key)
+        if cached is not None and (not explain or "explanation" in cached):
+            results[key] = cached
+        else:
+            pending.append(key)
+    STAGE_SECONDS.observe(time.perf_counter() - start, "cache_lookup")
+    keyword_hits = sum(match is not None for match in matches)
+    PREDICTIONS.inc(keyword_hits, "keyword")
+    PREDICTIONS.inc(len(unique) - keyword_hits - len(pending), "cache")
+    PREDICTIONS.inc(len(pending), "model")
+    
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        chunk_keys = pending[start:start + BATCH_CHUNK_SIZE]
+        texts = [key[1] for key in chunk_keys]
+        # Vectorize once and share the features with the explainer
+        inference = model.infer(texts, return_features=explain)
+        
+        explanations = [None] * len(texts)
+        if explain:
+            explain_start = time.perf_counter()
+            # Explains the class that was served, which may come from the
+            # float32 kernel rather than the exact coefficients
+            explanations = model_explainer.explain_batch(
+                texts, top_k=5, features=inference.features,
+                class_indices=inference.probabilities.argmax(axis=1)
+            )
+            STAGE_SECONDS.observe(time.perf_counter() - explain_start, "explain")
+        
+        confidences = inference.confidences.tolist()
+        overrides = {}
+        if fallback:
+            neighbors_start = time.perf_counter()
+            overrides = fallback.apply(texts, confidences)
+            STAGE_SECONDS.observe(time.perf_counter() - neighbors_start, "neighbors")
+        
+        for i, (key, category, confidence, explanation) in enumerate(zip(chunk_keys, inference.labels.tolist(), confidences, explanations)):
+            if i in overrides:
+                # The similarity of the closest neighbour with that label, and
+                # those neighbours as the explanation
+                category, confidence, neighbours = overrides[i]
+                explanation = [{"word": text, "score": similarity} for text, label, similarity in neighbours if label == category]
+            result = {"category": category, "confidence": confidence}
+            if explain:
+                result["explanation"] = explanation
+            prediction_cache.put(key, result)
+            results[key] = result
+    
+    return [results[key] for key in keys]
 
 @app.post("/predict", response_model=PredictionResponse)
-def predict(request: TransactionRequest):
-    if not classifier:
+async def predict(request: TransactionRequest):
+    if classifier.pipeline is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
-    result = classifier.predict(request.description)[0]
-    
-    explanation = []
-    if explainer:
-        explanation = explainer.explain(request.description)
-        # Limit to top 5 features
-        explanation = explanation[:5]
+    if batcher:
+        result = await batcher.submit(request.description)
+    else:
+        result = (await run_in_threadpool(predict_cached, [request.description], True))[0]
         
-    return {
+    return json_response({
         "category": result["category"],
         "confidence": result["confidence"],
-        "explanation": explanation
-    }
+        "explanation": result.get("explanation", []),
+        **({"keywords": result["keywords"]} if "keywords" in result else {})
+    })
 
 class BatchTransactionRequest(BaseModel):
     transactions: List[TransactionRequest]
+    explain: bool = False
 
 @app.post("/predict_batch")
-def predict_batch(request: BatchTransactionRequest):
-    if not classifier:
+def predict_batch(request: BatchTransactionRequest, format: Optional[str] = None):
+    """
+    With ?format=json, ndjson or arrow the predictions come back as columns
+    (category ids and confidences, no echoed fields) instead of one object
+    per row.
+    """
+    model = classifier
+    if model.pipeline is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
+    if format is not None:
+        check_columnar_format(format)
+        if request.explain:
+            raise HTTPException(status_code=400, detail="Explanations are only returned one object per row")
+    
+    descriptions = [txn.description for txn in request.transactions]
+    preds = predict_cached(descriptions, explain=request.explain)
+    if format is not None:
+        return columnar_response(preds, model, format)
     
     results = []
-    for txn in request.transactions:
-        # For batch, we skip explanation to be faster, or we could make it optional
-        # Here we'll skip it for performance
-        pred = classifier.predict(txn.description)[0]
-        results.append({
+    for txn, pred in zip(request.transactions, preds):
+        result = {
             "description": txn.description,
             "amount": txn.amount,
             "category": pred["category"],
             "confidence": pred["confidence"]
-        })
+        }
+        # Explanations are opt-in for batches
+        if request.explain and "explanation" in pred:
+            result["explanation"] = pred["explanation"]
+            if "keywords" in pred:
+                result["keywords"] = pred["keywords"]
+        results.append(result)
         
-    return results
+    return json_response(results)
+
+@app.post("/predict_columns")
+async def predict_columns(request: Request, format: str = "json"):
+    """
+    Columnar counterpart of /predict_batch: the request body is parallel
+    columns in `format` (json, ndjson or arrow, see src/columnar.py) and
+    the response is the predictions in the same format.
+    """
+    model = classifier
+    if model.pipeline is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    check_columnar_format(format)
+    
+    body = await request.body()
+    try:
+        descriptions, _ = columnar.read_columns(body, format)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {format} body: {e}")
+    
+    preds = await run_in_threadpool(predict_cached, descriptions)
+    return columnar_response(preds, model, format)
+
+@app.post("/predict_stream")
+async def predict_stream(request: Request, format: str = "csv"):
+    """
+    Categorizes a raw CSV (or NDJSON with ?format=ndjson) request body with a
+    'description' column and streams the results back chunk by chunk. The
+    body is parsed as it arrives, so the first results go out once the first
+    BATCH_CHUNK_SIZE rows are in, not after the whole upload.
+    """
+    if classifier.pipeline is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    
+    chunks = read_stream_records(request.stream(), format, BATCH_CHUNK_SIZE)
+    
+    def categorize(frame, header):
+        return format_frame(next(categorize_chunks([frame], predict_cached)), format, header=header)
+    
+    # Problems with the header or first chunk are reported as a 400 before
+    # any of the response is sent, rather than as a truncated 200
+    try:
+        header, records = await chunks.__anext__()
+        first = await run_in_threadpool(parse_records, header, records, format)
+        if "description" not in first.columns and (format == "csv" or records):
+            raise ValueError("Input must contain a 'description' column")
+    except StopAsyncIteration:
+        first = None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {format} body: {e}")
+    
+    async def results():
+        if first is None:
+            return
+        yield await run_in_threadpool(categorize, first, True)
+        async for header, records in chunks:
+            frame = await run_in_threadpool(parse_records, header, records, format)
+            yield await run_in_threadpool(categorize, frame, False)
+    
+    return StreamingResponse(results(), media_type=MEDIA_TYPES[format])
 
 class FeedbackRequest(BaseModel):
     description: str
@@ -80,16 +559,114 @@ class FeedbackRequest(BaseModel):
 
 @app.post("/feedback")
 def submit_feedback(request: FeedbackRequest):
-    feedback_file = "data/feedback.csv"
-    file_exists = os.path.exists(feedback_file)
+    # Returns once the correction is on disk; the online update runs later on
+    # the learner's own thread
+    if not feedback_store.add(request.description, request.correct_category, wait=True, timeout=FEEDBACK_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Feedback could not be saved, please retry")
     
-    with open(feedback_file, "a") as f:
-        if not file_exists:
-            f.write("description,correct_category\n")
-        f.write(f"{request.description},{request.correct_category}\n")
+    learner = online_learner
+    if learner:
+        learner.submit(request.description, request.correct_category)
     
     return {"message": "Feedback received"}
 
+@app.get("/online_stats")
+def get_online_stats():
+    if not online_learner:
+        return {"enabled": False}
+    return {"enabled": True, **online_learner.stats()}
+
+@app.get("/cache_stats")
+def get_cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/keyword_stats")
+def get_keyword_stats():
+    if not keyword_matcher:
+        return {"enabled": False}
+    return {"enabled": True, **keyword_matcher.stats()}
+
+@app.get("/neighbor_stats")
+def get_neighbor_stats():
+    if not neighbor_fallback:
+        return {"enabled": False}
+    return {"enabled": True, **neighbor_fallback.stats()}
+
+@app.get("/version")
+def get_version():
+    return {
+        "model_path": MODEL_PATH,
+        "model_version": classifier.version,
+        "deployed_model_version": versions["model"],
+        "model_loaded_at": versions["model_loaded_at"],
+        # Hash of the category config a .tcm export was made with, comparable
+        # with config_version
+        "model_config_hash": getattr(classifier.pipeline, "config_hash", None),
+        "config_path": CONFIG_PATH,
+        "config_version": versions["config"],
+        "config_loaded_at": versions["config_loaded_at"],
+        "keywords_version": keyword_matcher.version if keyword_matcher else None,
+        "reloads": reloader.reloads if reloader else 0,
+        "reload_failures": reloader.failures if reloader else 0,
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+def _cache_stat(name):
+    return lambda: prediction_cache.stats()[name]
+
+def _keyword_stat(name):
+    return lambda: keyword_matcher.stats()[name] if keyword_matcher else None
+
+def _neighbor_stat(name):
+    return lambda: neighbor_fallback.stats()[name] if neighbor_fallback else None
+
+for metric in [
+    CallbackMetric("prediction_cache_entries", "Entries in the prediction cache.", _cache_stat("size")),
+    CallbackMetric("prediction_cache_hits_total", "Prediction cache hits.", _cache_stat("hits"), type="counter"),
+    CallbackMetric("prediction_cache_misses_total", "Prediction cache misses.", _cache_stat("misses"), type="counter"),
+    CallbackMetric("prediction_cache_evictions_total", "Prediction cache evictions.", _cache_stat("evictions"), type="counter"),
+    CallbackMetric("keyword_lookups_total", "Descriptions checked by the keyword fast path.", _keyword_stat("lookups"), type="counter"),
+    CallbackMetric("keyword_hits_total", "Descriptions answered by the keyword fast path.", _keyword_stat("hits"), type="counter"),
+    CallbackMetric("neighbor_lookups_total", "Low-confidence predictions looked up in the nearest-merchant index.", _neighbor_stat("lookups"), type="counter"),
+    CallbackMetric("neighbor_overrides_total", "Predictions replaced by the nearest-merchant fallback.", _neighbor_stat("accepted"), type="counter"),
+    CallbackMetric(
+        "model_info", "Active model and config versions.",
+        lambda: [((classifier.version, versions["model"], versions["config"]), 1)],
+        ["version", "deployed_version", "config_version"]
+    ),
+    CallbackMetric("model_reloads_total", "Model and config reloads.", lambda: reloader.reloads if reloader else 0, type="counter"),
+    CallbackMetric("online_updates_total", "Online learning updates.", lambda: online_learner.updates if online_learner else 0, type="counter"),
+]:
+    REGISTRY.register(metric)
+
+def _require_profiler():
+    if not PROFILER_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Profiler endpoints are disabled (PROFILER_ENDPOINTS=1)")
+
+@app.post("/profiler/start")
+def start_profiler(interval_ms: float = 5.0):
+    _require_profiler()
+    profiler.start(interval_ms / 1000)
+    return profiler.stats()
+
+@app.post("/profiler/stop")
+def stop_profiler():
+    _require_profiler()
+    profiler.stop()
+    return profiler.stats()
+
+@app.get("/profiler")
+def get_profile(limit: Optional[int] = None):
+    """
+    Stack samples collected so far, in collapsed-stack format for
+    flamegraph.pl or speedscope.
+    """
+    _require_profiler()
+    return PlainTextResponse(profiler.report(limit))
+
 @app.get("/categories")
 def get_categories():
     return config["categories"]
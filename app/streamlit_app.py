@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
 import sys
 
@@ -9,6 +10,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.model import TransactionClassifier
 from src.explainability import Explainer
 from src.data_generator import generate_synthetic_data, load_config
+from src.feedback import FeedbackStore
+from app.jobs import get_job_cache, show_job
 
 st.set_page_config(page_title="Transaction Categorizer", layout="wide")
 
@@ -38,10 +41,12 @@ def get_model():
 
 @st.cache_resource
 def get_explainer():
-    model_path = "models/model.pkl"
-    if os.path.exists(model_path):
-        return Explainer(model_path)
-    return None
+    # Reuse the classifier's pipeline instead of unpickling the model again
+    return Explainer(pipeline=get_model().pipeline)
+
+@st.cache_resource
+def get_feedback_store():
+    return FeedbackStore("data/feedback.db").start()
 
 def get_config():
     return load_config()
@@ -79,18 +84,13 @@ with col1:
         correct_cat = st.selectbox("Correct Category", cat_names, index=cat_names.index(result['category']) if result['category'] in cat_names else 0)
         
         if st.button("Submit Feedback"):
-            feedback_file = "data/feedback.csv"
-            file_exists = os.path.exists(feedback_file)
-            with open(feedback_file, "a") as f:
-                if not file_exists:
-                    f.write("description,correct_category\n")
-                f.write(f"{description},{correct_cat}\n")
+            get_feedback_store().add(description, correct_cat)
             st.success("Feedback recorded locally!")
 
         # Explanation
         st.subheader("Explanation")
         if explainer:
-            explanation = explainer.explain(description)[:5]
+            explanation = explainer.explain(description, top_k=5)
             if explanation:
                 exp_df = pd.DataFrame(explanation)
                 st.bar_chart(exp_df.set_index("word"))
@@ -112,12 +112,18 @@ tab1, tab2 = st.tabs(["Upload CSV", "Manual Entry"])
 with tab1:
     uploaded_file = st.file_uploader("Upload CSV", type=["csv"])
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
-        if "description" in df.columns:
-            if st.button("Process CSV"):
-                descriptions = df["description"].tolist()
-                results = classifier.predict(descriptions)
-                result_df = pd.DataFrame(results)
-                # Add original description back
-                result_df.insert(0, "description", descriptions)
-                st.dataframe(result_df)
+        data = uploaded_file.getvalue()
+        jobs = get_job_cache()
+        # A file already processed (or in progress) with this model is shown
+        # again on every rerun instead of being recomputed
+        job = jobs.get(jobs.file_hash(data), classifier.version)
+        if job is None or job.status in ("failed", "cancelled"):
+            preview = pd.read_csv(io.BytesIO(data), nrows=5)
+            if "description" in preview.columns:
+                st.write("Preview:", preview)
+                if st.button("Process CSV"):
+                    job = jobs.submit(data, classifier.predict_batch, classifier.version)
+            else:
+                st.error("CSV must contain a 'description' column")
+        if job is not None:
+            show_job(job)
@@ -2,6 +2,15 @@ import streamlit as st
 import requests
 import pandas as pd
 import yaml
+import io
+import json
+import os
+import sys
+
+# Add root directory to path so we can import src
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.jobs import get_job_cache, show_job
 
 st.set_page_config(page_title="Transaction Categorizer", layout="wide")
 
@@ -16,6 +25,31 @@ def get_categories():
         return []
     return []
 
+def get_model_version():
+    try:
+        response = requests.get(f"{API_URL}/version")
+        if response.status_code == 200:
+            return response.json()["model_version"]
+    except:
+        return None
+    return None
+
+def predict_chunk(descriptions):
+    """
+    Categorizes one chunk of an upload through /predict_columns.
+    """
+    response = requests.post(
+        f"{API_URL}/predict_columns", data=json.dumps({"description": descriptions}),
+        headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+    columns = response.json()
+    categories = columns["categories"]
+    return [
+        {"category": categories[category], "confidence": confidence}
+        for category, confidence in zip(columns["category"], columns["confidence"])
+    ]
+
 st.title("💰 Transaction Categorization System")
 
 col1, col2 = st.columns([1, 1])
@@ -55,6 +89,8 @@ with col1:
                 if data['explanation']:
                     exp_df = pd.DataFrame(data['explanation'])
                     st.bar_chart(exp_df.set_index("word"))
+                elif data.get('keywords'):
+                    st.info(f"Matched merchant keywords: {', '.join(data['keywords'])}")
                 else:
                     st.info("No specific words contributed to this prediction (likely unknown words).")
             else:
@@ -82,33 +118,25 @@ tab1, tab2 = st.tabs(["Upload CSV", "Manual Entry"])
 with tab1:
     uploaded_file = st.file_uploader("Upload CSV (must contain 'description' column)", type=["csv"])
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
-        if "description" in df.columns:
-            st.write("Preview:", df.head())
-            if st.button("Process CSV"):
-                transactions = [{"description": desc, "amount": 0.0} for desc in df["description"].tolist()]
-                try:
-                    response = requests.post(f"{API_URL}/predict_batch", json={"transactions": transactions})
-                    if response.status_code == 200:
-                        results = response.json()
-                        result_df = pd.DataFrame(results)
-                        st.success("Batch processing complete!")
-                        st.dataframe(result_df)
-                        
-                        csv = result_df.to_csv(index=False).encode('utf-8')
-                        st.download_button(
-                            "Download Results",
-                            csv,
-                            "categorized_transactions.csv",
-                            "text/csv",
-                            key='download-csv'
-                        )
+        data = uploaded_file.getvalue()
+        version = get_model_version()
+        jobs = get_job_cache()
+        # Chunks are posted one request at a time from a background job, and a
+        # file already processed with the served model is not sent again
+        job = jobs.get(jobs.file_hash(data), version) if version else None
+        if job is None or job.status in ("failed", "cancelled"):
+            preview = pd.read_csv(io.BytesIO(data), nrows=5)
+            if "description" in preview.columns:
+                st.write("Preview:", preview)
+                if st.button("Process CSV"):
+                    if version:
+                        job = jobs.submit(data, predict_chunk, version)
                     else:
-                        st.error(f"Error: {response.status_code}")
-                except Exception as e:
-                    st.error(f"Connection error: {e}")
-        else:
-            st.error("CSV must contain a 'description' column")
+                        st.error("Could not connect to API. Is the backend running?")
+            else:
+                st.error("CSV must contain a 'description' column")
+        if job is not None:
+            show_job(job)
 
 with tab2:
     st.write("Enter multiple transaction descriptions (one per line):")
@@ -0,0 +1,43 @@
+"""
+Throughput benchmark for batch prediction.
+
+Compares the old per-row loop (TransactionClassifier.predict once per
+description) with the vectorized, chunked TransactionClassifier.predict_batch.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_batch
+"""
+import time
+import pandas as pd
+from src.model import TransactionClassifier
+
+BATCH_SIZES = [1, 100, 10_000, 100_000]
+# The per-row loop is too slow to run at full size, its rate is stable
+# well before this many rows
+MAX_LOOP_ROWS = 2_000
+
+def rows_per_sec(fn, texts):
+    start = time.perf_counter()
+    fn(texts)
+    return len(texts) / (time.perf_counter() - start)
+
+def main(data_path="data/transactions.csv", model_path="models/model.pkl"):
+    classifier = TransactionClassifier()
+    classifier.load_model(model_path)
+
+    pool = pd.read_csv(data_path)["description"]
+    loop = lambda texts: [classifier.predict(text)[0] for text in texts]
+
+    # Sanity check: both paths agree
+    sample = pool.sample(1000, random_state=0).tolist()
+    assert loop(sample) == classifier.predict_batch(sample)
+
+    print(f"{'batch size':>12} {'per-row rows/s':>16} {'vectorized rows/s':>19} {'speedup':>9}")
+    for size in BATCH_SIZES:
+        texts = pool.sample(size, replace=True, random_state=size).tolist()
+        looped = rows_per_sec(loop, texts[:MAX_LOOP_ROWS])
+        vectorized = rows_per_sec(classifier.predict_batch, texts)
+        print(f"{size:>12,} {looped:>16,.0f} {vectorized:>19,.0f} {vectorized / looped:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Parity check and latency benchmark for Explainer.explain, and throughput of
+Explainer.explain_batch.
+
+Compares the closed-form LinearAttribution engine against the SHAP
+LinearExplainer reference on descriptions from the training data, then
+times explaining 1k and 100k rows one `explain` call at a time against one
+`explain_batch` call over the whole matrix (features precomputed, as
+/predict_batch does), checking both give the same lists.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_explain
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+from src.explainability import Explainer
+from src.preprocessing import normalize_batch
+
+def time_calls(fn, texts, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (len(texts) * repeat)
+
+def check_parity(explainer, texts, atol=1e-9):
+    mismatches = 0
+    for text in texts:
+        fast = explainer.explain(text)
+        ref = explainer.explain_shap(text)
+        same_words = [e["word"] for e in fast] == [e["word"] for e in ref]
+        same_scores = np.allclose([e["score"] for e in fast], [e["score"] for e in ref], atol=atol)
+        if not (same_words and same_scores):
+            mismatches += 1
+            print(f"MISMATCH for {text!r}:\n  fast={fast}\n  shap={ref}")
+    return mismatches
+
+def batch_throughput(explainer, texts, sizes=(1000, 100000), top_k=5):
+    mismatches = 0
+    print(f"\n{'rows':>8} {'explain loop':>16} {'explain_batch':>16} {'speedup':>8}")
+    for size in sizes:
+        batch = texts[:size]
+        features = explainer.vectorizer.transform(normalize_batch(batch))
+
+        start = time.perf_counter()
+        looped = [explainer.explain(text, top_k=top_k, features=features[i]) for i, text in enumerate(batch)]
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = explainer.explain_batch(batch, top_k=top_k, features=features)
+        batch_seconds = time.perf_counter() - start
+
+        mismatches += looped != batched
+        print(f"{size:>8,} {size / loop_seconds:>11,.0f} rows/s {size / batch_seconds:>11,.0f} rows/s "
+              f"{loop_seconds / batch_seconds:>7.1f}x")
+    return mismatches
+
+def main(data_path="data/transactions.csv", n_parity=200, n_timing=2000):
+    import warnings
+    warnings.filterwarnings("ignore", category=FutureWarning)
+
+    explainer = Explainer()
+    descriptions = pd.read_csv(data_path)["description"]
+    texts = descriptions.sample(n_timing, random_state=42).tolist()
+
+    mismatches = check_parity(explainer, texts[:n_parity])
+    print(f"Parity: {n_parity - mismatches}/{n_parity} descriptions match SHAP")
+
+    shap_latency = time_calls(explainer.explain_shap, texts[:n_parity])
+    fast_latency = time_calls(explainer.explain, texts)
+    print(f"SHAP LinearExplainer: {shap_latency * 1e6:10.1f} us/call")
+    print(f"LinearAttribution:    {fast_latency * 1e6:10.1f} us/call")
+    print(f"Speedup:              {shap_latency / fast_latency:10.1f}x")
+
+    # Repeats rows if the data has fewer than 100k
+    rows = descriptions.sample(100000, replace=len(descriptions) < 100000, random_state=42).tolist()
+    batch_mismatches = batch_throughput(explainer, rows)
+    print(f"explain_batch matches explain: {'yes' if not batch_mismatches else 'NO'}")
+
+    return 1 if mismatches or batch_mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
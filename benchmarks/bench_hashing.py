@@ -0,0 +1,65 @@
+"""
+Compares the default TF-IDF model with the hashed character n-gram variant
+(TransactionClassifier(vectorizer="hashing")) on the synthetic dataset:
+accuracy / macro-F1, fit time, prediction latency, artifact size and load
+time.
+
+Usage (from the repo root, after generating data):
+    python -m benchmarks.bench_hashing
+"""
+import pickle
+import time
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+from src.model import TransactionClassifier
+
+def evaluate(name, X_train, X_test, y_train, y_test):
+    classifier = TransactionClassifier(vectorizer=name)
+    classifier.pipeline = classifier.build_pipeline()
+
+    start = time.perf_counter()
+    classifier.pipeline.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+
+    y_pred = [r["category"] for r in classifier.predict_batch(X_test)]
+
+    single = X_test[:1000]
+    start = time.perf_counter()
+    for text in single:
+        classifier.predict(text)
+    single_latency = (time.perf_counter() - start) / len(single)
+
+    start = time.perf_counter()
+    classifier.predict_batch(X_test)
+    batch_rate = len(X_test) / (time.perf_counter() - start)
+
+    blob = pickle.dumps(classifier.pipeline)
+    start = time.perf_counter()
+    pickle.loads(blob)
+    load_time = time.perf_counter() - start
+
+    n_features = classifier.pipeline.named_steps['clf'].coef_.shape[1]
+    return {
+        "model": name,
+        "accuracy": accuracy_score(y_test, y_pred),
+        "macro_f1": f1_score(y_test, y_pred, average="macro"),
+        "fit_s": fit_time,
+        "single_us": single_latency * 1e6,
+        "batch_rows_per_s": batch_rate,
+        "features": n_features,
+        "pickle_kb": len(blob) / 1024,
+        "load_ms": load_time * 1000,
+    }
+
+def main(data_path="data/transactions.csv"):
+    df = pd.read_csv(data_path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df["description"].tolist(), df["category"].tolist(), test_size=0.2, random_state=42
+    )
+
+    rows = [evaluate(name, X_train, X_test, y_train, y_test) for name in ("tfidf", "hashing")]
+    print(pd.DataFrame(rows).set_index("model").T.to_string(float_format=lambda v: f"{v:,.4f}"))
+
+if __name__ == "__main__":
+    main()
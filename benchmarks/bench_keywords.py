@@ -0,0 +1,69 @@
+"""
+Keyword fast path (src/keywords.py): hit rate, precision against the labels
+and agreement with the model on the descriptions it answers, lookup cost
+versus model inference, and the end-to-end saving in predict_cached with
+the fast path on and off (prediction cache disabled). Batches are
+deduplicated by predict_cached, so their per-row model cost is already low
+on the synthetic data; single /predict calls are where the fast path pays.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_keywords
+"""
+import time
+import numpy as np
+import pandas as pd
+import app.main as api
+from src.cache import PredictionCache
+from src.keywords import KeywordMatcher
+from src.preprocessing import normalize_batch
+
+def per_row_us(fn, items, repeat=3):
+    best = min(_timed(fn, items) for _ in range(repeat))
+    return best / len(items) * 1e6
+
+def _timed(fn, items):
+    start = time.perf_counter()
+    fn(items)
+    return time.perf_counter() - start
+
+def main(data_path="data/transactions.csv", num_rows=20000):
+    api.load_models()
+    api.prediction_cache = PredictionCache(max_size=0)
+    df = pd.read_csv(data_path).sample(num_rows, random_state=0)
+    descriptions = df["description"].tolist()
+    texts = normalize_batch(descriptions)
+
+    matcher = KeywordMatcher()
+    matches = matcher.match_batch(texts, normalized=True)
+    hit = np.array([match is not None for match in matches])
+    predicted = np.array([match[0] for match in matches if match is not None])
+    labels = df["category"].to_numpy()[hit]
+    model_labels = api.classifier.infer([text for text, h in zip(texts, hit) if h]).labels
+
+    print(f"keywords compiled:    {matcher.keywords} ({len(matcher.ambiguous)} ambiguous: {', '.join(matcher.ambiguous)})")
+    print(f"hit rate:             {hit.mean():.1%}")
+    print(f"precision on hits:    {(predicted == labels).mean():.2%}")
+    print(f"agreement with model: {(predicted == model_labels).mean():.2%}")
+
+    print("\nper description        fast path      model")
+    match_us = per_row_us(lambda items: [matcher.match(text) for text in items], texts)
+    single_us = per_row_us(lambda items: [api.classifier.infer([text]) for text in items], texts[:500])
+    batch_us = per_row_us(api.classifier.infer, texts)
+    print(f"one at a time        {match_us:9.2f} us {single_us:9.1f} us")
+    print(f"batch of {len(texts):<10,}  {match_us:9.2f} us {batch_us:9.1f} us")
+
+    print("\npredict_cached           fast path off  fast path on    saving")
+    calls = [
+        ("/predict, one by one", lambda items: [api.predict_cached([item], explain=True) for item in items], descriptions[:500]),
+        ("/predict_batch", lambda items: api.predict_cached(items), descriptions),
+        ("  with explanations", lambda items: api.predict_cached(items, explain=True), descriptions),
+    ]
+    for label, fn, items in calls:
+        api.keyword_matcher = None
+        off = per_row_us(fn, items)
+        api.keyword_matcher = matcher
+        on = per_row_us(fn, items)
+        print(f"{label:<23} {off:10.1f} us {on:10.1f} us {1 - on / off:9.0%}")
+
+if __name__ == "__main__":
+    main()
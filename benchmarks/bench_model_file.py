@@ -0,0 +1,51 @@
+"""
+Single-file model export (src/model_store.py): file size and load time
+against the pickle, and prediction parity of the float32 and float64
+exports with the pickled pipeline on the training descriptions.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_model_file
+"""
+import os
+import pickle
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.model_store import export_model_file, load_model_file
+
+def load_ms(fn, repeat=20):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main(model_path="models/model.pkl", data_path="data/transactions.csv", num_rows=50000):
+    with open(model_path, 'rb') as f:
+        pipeline = pickle.load(f)
+    texts = pd.read_csv(data_path, nrows=num_rows)["description"].tolist()
+    expected = pipeline.predict_proba(texts)
+    expected_labels = pipeline.classes_[expected.argmax(axis=1)]
+
+    def load_pickle():
+        with open(model_path, 'rb') as f:
+            pickle.load(f)
+
+    print(f"{'format':<10} {'size':>10} {'load':>10} {'no verify':>10} {'labels':>8} {'max |dp|':>10}")
+    print(f"{'pickle':<10} {os.path.getsize(model_path):>8,} B {load_ms(load_pickle):>7.3f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in (np.float32, np.float64):
+            path = os.path.join(tmp, f"model_{np.dtype(dtype).name}.tcm")
+            export_model_file(pipeline, path, dtype=dtype)
+            loaded = load_model_file(path)
+            probs = loaded.predict_proba(texts)
+            agreement = (loaded.classes_[probs.argmax(axis=1)] == expected_labels).mean()
+            print(f"{np.dtype(dtype).name:<10} {os.path.getsize(path):>8,} B "
+                  f"{load_ms(lambda: load_model_file(path)):>7.3f} ms "
+                  f"{load_ms(lambda: load_model_file(path, verify=False)):>7.3f} ms "
+                  f"{agreement:>8.2%} {np.abs(probs - expected).max():>10.2e}")
+
+if __name__ == "__main__":
+    main()
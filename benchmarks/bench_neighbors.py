@@ -0,0 +1,77 @@
+"""
+Nearest-merchant fallback (src/neighbors.py): what fraction of traffic falls
+below the confidence gate and is looked up, how often the neighbours
+override the model and how accurate each is on those rows, and the latency
+a lookup adds for a description seen for the first time (embedded) and
+again (from the embedding cache). Needs sentence-transformers and an index
+built with `python -m src.neighbors`.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_neighbors
+"""
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.keywords import KeywordMatcher
+from src.model import TransactionClassifier
+from src.neighbors import NeighborIndex, NeighborFallback
+from src.preprocessing import normalize_batch
+
+def lookup_ms(index, texts):
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        index.search([text])
+        latencies.append(time.perf_counter() - start)
+    return np.percentile(latencies, [50, 99]) * 1000
+
+def main(data_path="data/transactions.csv", index_path="models/merchant_index.npz",
+         num_rows=20000, confidence=0.6, min_similarity=0.8):
+    classifier = TransactionClassifier()
+    classifier.load_model()
+    # Noisy variants of the training descriptions, so the eval rows are not
+    # all already in the index
+    df = pd.read_csv(data_path).sample(num_rows, random_state=1)
+    rng = np.random.default_rng(1)
+    descriptions = [f"{text} {code}" for text, code in zip(df["description"], rng.integers(1000, 99999, len(df)))]
+    texts = normalize_batch(descriptions)
+    labels = df["category"].to_numpy()
+
+    keyword_hits = np.array([match is not None for match in KeywordMatcher().match_batch(texts, normalized=True)])
+    inference = classifier.infer(texts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NeighborIndex.load(index_path, cache_path=f"{tmp}/embeddings.db")
+        fallback = NeighborFallback(index, confidence, min_similarity)
+        model_rows = np.flatnonzero(~keyword_hits)
+
+        start = time.perf_counter()
+        overrides = fallback.apply([texts[i] for i in model_rows], inference.confidences[model_rows].tolist())
+        batch_seconds = time.perf_counter() - start
+
+        looked_up = model_rows[inference.confidences[model_rows] < confidence]
+        overridden = model_rows[sorted(overrides)]
+        corrected = inference.labels.copy()
+        for i, (label, _, _) in overrides.items():
+            corrected[model_rows[i]] = label
+
+        print(f"rows:                         {len(texts):,} ({keyword_hits.mean():.1%} answered by keywords)")
+        print(f"looked up (confidence < {confidence}): {len(looked_up) / len(texts):.1%} of traffic, "
+              f"{len(looked_up) / max(len(model_rows), 1):.1%} of model predictions")
+        print(f"overridden (similarity >= {min_similarity}): {len(overridden) / len(texts):.1%} of traffic")
+        if len(looked_up):
+            print(f"accuracy on looked-up rows:   model {(inference.labels[looked_up] == labels[looked_up]).mean():.1%}, "
+                  f"with fallback {(corrected[looked_up] == labels[looked_up]).mean():.1%}")
+        print(f"overall accuracy:             model {(inference.labels == labels).mean():.2%}, "
+              f"with fallback {(corrected == labels).mean():.2%}")
+        print(f"batch lookup:                 {batch_seconds / max(len(looked_up), 1) * 1e6:.0f} us/row")
+
+        # Fresh descriptions, then the same ones again from the cache
+        sample = [f"{texts[i]} x{n}" for n, i in enumerate(looked_up[:200] if len(looked_up) else model_rows[:200])]
+        cold = lookup_ms(index, sample)
+        warm = lookup_ms(index, sample)
+        print(f"single lookup p50/p99:        {cold[0]:.2f}/{cold[1]:.2f} ms new, {warm[0]:.2f}/{warm[1]:.2f} ms cached")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Microbenchmark for description normalization.
+
+Generates synthetic descriptions with src.data_generator and compares
+per-row normalize_text (as used by .apply / a per-document preprocessor)
+against normalize_batch.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_normalize [num_rows]
+"""
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from src.data_generator import generate_synthetic_data
+from src.preprocessing import normalize_text, normalize_batch
+
+def main(num_rows=1_000_000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        generate_synthetic_data(num_samples=num_rows, output_path=path)
+        descriptions = pd.read_csv(path)["description"]
+
+    texts = descriptions.tolist()
+
+    start = time.perf_counter()
+    per_row = descriptions.apply(normalize_text).tolist()
+    apply_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_row_list = [normalize_text(text) for text in texts]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = normalize_batch(descriptions)
+    batch_time = time.perf_counter() - start
+
+    assert per_row == per_row_list == batched
+
+    print(f"{'normalize_text via .apply':<28} {apply_time:7.3f}s  {num_rows / apply_time:>12,.0f} rows/s")
+    print(f"{'normalize_text list loop':<28} {loop_time:7.3f}s  {num_rows / loop_time:>12,.0f} rows/s")
+    print(f"{'normalize_batch':<28} {batch_time:7.3f}s  {num_rows / batch_time:>12,.0f} rows/s")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,39 @@
+"""
+Cost of an online feedback update (OnlineLearner mini-batch partial_fit,
+including copying the live pipeline) versus a full retrain of the same
+hashed-feature SGD model.
+
+Usage (from the repo root, after generating data):
+    python -m benchmarks.bench_online
+"""
+import time
+import numpy as np
+import pandas as pd
+from src.model import TransactionClassifier
+from src.online import OnlineLearner
+
+def main(data_path="data/transactions.csv", batch_sizes=(1, 32, 256)):
+    df = pd.read_csv(data_path)
+    classifier = TransactionClassifier(vectorizer="hashing", estimator="sgd")
+    classifier.pipeline = classifier.build_pipeline()
+
+    start = time.perf_counter()
+    classifier.pipeline.fit(df["description"], df["category"])
+    retrain = time.perf_counter() - start
+    classifier.version = "bench"
+    print(f"full retrain on {len(df):,} rows: {retrain * 1000:10.1f} ms")
+
+    feedback = df.sample(max(batch_sizes) * 10, random_state=0)
+    for batch_size in batch_sizes:
+        learner = OnlineLearner(classifier, batch_size=batch_size)
+        timings = []
+        for description, category in zip(feedback["description"], feedback["category"]):
+            if learner.add(description, category) is not None:
+                timings.append(learner.last_update_seconds)
+            if len(timings) == 10:
+                break
+        ms = np.median(timings) * 1000
+        print(f"online update, batch of {batch_size:>4}: {ms:10.1f} ms  ({retrain * 1000 / ms:,.0f}x faster than retrain)")
+
+if __name__ == "__main__":
+    main()
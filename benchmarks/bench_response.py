@@ -0,0 +1,85 @@
+"""
+Batch request and response encodings for /predict_batch and
+/predict_columns: payload size, server-side encode (response) and parse
+(request) time, and client-side decode time of the current row-per-object
+JSON against the columnar json, ndjson and arrow formats (src/columnar.py).
+Predictions are computed once up front, so only the encoding is timed.
+
+Usage (from the repo root, after training a model):
+    python -m benchmarks.bench_response
+"""
+import io
+import json
+import time
+import pandas as pd
+from src import columnar
+
+SIZES = [1000, 100000]
+
+def best_of(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def encode_rows(transactions, preds):
+    # What predict_batch does for the default response
+    results = [
+        {"description": txn["description"], "amount": txn.get("amount"), "category": pred["category"], "confidence": pred["confidence"]}
+        for txn, pred in zip(transactions, preds)
+    ]
+    return json.dumps(results, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def decode(body, fmt):
+    if fmt == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(body).read_all()
+    if fmt == "ndjson":
+        return [json.loads(line) for line in body.splitlines()]
+    return json.loads(body)
+
+def request_body(transactions, fmt):
+    descriptions = [txn["description"] for txn in transactions]
+    amounts = [txn["amount"] for txn in transactions]
+    if fmt == "rows":
+        return json.dumps({"transactions": transactions}).encode("utf-8")
+    if fmt == "arrow":
+        import pyarrow as pa
+        table = pa.table({"description": descriptions, "amount": amounts})
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+    if fmt == "ndjson":
+        return "".join(json.dumps(txn) + "\n" for txn in transactions).encode("utf-8")
+    return json.dumps({"description": descriptions, "amount": amounts}).encode("utf-8")
+
+def main(data_path="data/transactions.csv"):
+    import app.main as api
+
+    api.load_models()
+    pool = pd.read_csv(data_path)
+    for size in SIZES:
+        sample = pool.sample(size, replace=True, random_state=size)
+        transactions = [{"description": text, "amount": float(amount)} for text, amount in zip(sample["description"], sample["amount"])]
+        preds = api.predict_cached([txn["description"] for txn in transactions])
+        classes = api.classifier.pipeline.classes_.tolist()
+
+        print(f"\n{size:,} rows")
+        print(f"{'format':<8} {'request':>10} {'parse':>10} {'response':>10} {'encode':>10} {'decode':>10}")
+        for fmt in ["rows", "json", "ndjson", "arrow"]:
+            body = request_body(transactions, fmt)
+            if fmt == "rows":
+                parse_ms, _ = best_of(lambda: api.BatchTransactionRequest(**json.loads(body)))
+                encode_ms, response = best_of(lambda: encode_rows(transactions, preds))
+            else:
+                parse_ms, _ = best_of(lambda: columnar.read_columns(body, fmt))
+                encode_ms, response = best_of(lambda: columnar.write_columns(*columnar.to_columns(preds, classes), fmt))
+            decode_ms, _ = best_of(lambda: decode(response, "json" if fmt == "rows" else fmt))
+            print(f"{fmt:<8} {len(body) / 1024:>7,.0f} KB {parse_ms:>7.1f} ms "
+                  f"{len(response) / 1024:>7,.0f} KB {encode_ms:>7.1f} ms {decode_ms:>7.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Load-generation benchmark for /predict: per-request threadpool path versus
+the async micro-batching scheduler (ASYNC_SERVING=1).
+
+Runs the FastAPI app in-process through httpx's ASGI transport, with the
+prediction cache disabled so every request does real inference.
+
+Usage (from the repo root, after training a model and
+`pip install -r requirements-dev.txt` for httpx):
+    python -m benchmarks.bench_serving [concurrency] [requests]
+"""
+import asyncio
+import sys
+import time
+import httpx
+import numpy as np
+import pandas as pd
+import app.main as api
+from src.batching import MicroBatcher
+from src.cache import PredictionCache
+
+async def generate_load(client, texts, concurrency):
+    latencies = []
+    queue = iter(texts)
+
+    async def worker():
+        for text in queue:
+            start = time.perf_counter()
+            response = await client.post("/predict", json={"description": text})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), elapsed
+
+async def run(mode, texts, concurrency):
+    if mode == "micro-batched":
+        api.batcher = MicroBatcher(
+            lambda descriptions: api.predict_cached(descriptions, explain=True),
+            window_ms=api.MICROBATCH_WINDOW_MS,
+            max_batch=api.MICROBATCH_MAX_SIZE
+        )
+        await api.batcher.start()
+    else:
+        api.batcher = None
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        latencies, elapsed = await generate_load(client, texts, concurrency)
+
+    if api.batcher:
+        await api.batcher.stop()
+        api.batcher = None
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{mode:<15} {len(texts) / elapsed:>10,.0f} {p50:>10.2f} {p99:>10.2f}")
+
+def main(concurrency=64, num_requests=5000, data_path="data/transactions.csv"):
+    api.load_models()
+    # Measure inference, not cache hits
+    api.prediction_cache = PredictionCache(max_size=0)
+
+    texts = pd.read_csv(data_path)["description"].sample(num_requests, replace=True, random_state=0).tolist()
+
+    print(f"concurrency={concurrency} requests={num_requests} "
+          f"window={api.MICROBATCH_WINDOW_MS}ms max_batch={api.MICROBATCH_MAX_SIZE}")
+    print(f"{'mode':<15} {'RPS':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode in ("synchronous", "micro-batched"):
+        asyncio.run(run(mode, texts, concurrency))
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args)
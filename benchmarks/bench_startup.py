@@ -0,0 +1,48 @@
+"""
+Cold-start benchmark: import time of app.main and time to first prediction,
+each measured in a fresh interpreter, for the pickled model and the
+memory-mapped export.
+
+Usage (from the repo root, after training and exporting a model):
+    python -m src.model_store models/model.pkl models/model_mmap
+    python -m benchmarks.bench_startup
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main as api
+imported = time.perf_counter()
+api.load_models()
+api.predict_cached(["STARBUCKS COFFEE NY"], explain=True)
+first_prediction = time.perf_counter()
+heavy = [m for m in ("sklearn", "mlflow", "shap", "matplotlib", "seaborn") if m in sys.modules]
+print(json.dumps({"import": imported - start, "first_prediction": first_prediction - start, "heavy_modules": heavy}))
+"""
+
+def measure(model_path, runs=3):
+    env = dict(os.environ, MODEL_PATH=model_path, MLFLOW_DISABLE_AGENT_HINT="1")
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    # Best of N filters out noise from other processes
+    return min(results, key=lambda r: r["first_prediction"])
+
+def main(model_paths=("models/model.pkl", "models/model_mmap")):
+    print(f"{'model':<22} {'import s':>9} {'first prediction s':>19}  heavy modules loaded")
+    for path in model_paths:
+        if not os.path.exists(path):
+            print(f"{path:<22} (missing)")
+            continue
+        r = measure(path)
+        print(f"{path:<22} {r['import']:>9.3f} {r['first_prediction']:>19.3f}  {', '.join(r['heavy_modules']) or '-'}")
+
+if __name__ == "__main__":
+    main(tuple(sys.argv[1:]) or ("models/model.pkl", "models/model_mmap"))
@@ -0,0 +1,96 @@
+"""
+Wall-clock and peak memory of training on 1M / 10M / 50M-row datasets:
+the in-memory pipeline (TransactionClassifier.train) against out-of-core
+training (TransactionClassifier.train_streaming).
+
+Datasets are generated once with the vectorized generator (fixed seed) and
+kept under data/. Every run happens in a fresh process, so peak RSS is the
+run's own; MLflow logs go to a temporary directory. "trained" is the time
+until train() returns, "total" also includes saving the model and waiting
+for the background report. "children" is the largest child process: the
+featurization workers, and the subprocess MLflow starts to infer the
+model's pip requirements.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_training
+    python -m benchmarks.bench_training --rows 1000000 --in-memory-up-to 1000000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(mode, data_path, chunk_size, workers):
+    from src.model import TransactionClassifier
+
+    start = time.perf_counter()
+    if mode == "streaming":
+        classifier = TransactionClassifier(vectorizer="hashing", estimator="sgd")
+        classifier.train_streaming(data_path, chunk_size=chunk_size, workers=workers)
+    else:
+        classifier = TransactionClassifier()
+        classifier.train(data_path)
+    trained = time.perf_counter() - start
+
+    classifier.save_model("model.pkl")
+    classifier.report_thread.join()
+    total = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({
+        "trained_seconds": trained,
+        "total_seconds": total,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "children_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+    }))
+
+def measure(mode, data_path, chunk_size, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=ROOT, MLFLOW_TRACKING_URI=f"sqlite:///{tmp}/mlflow.db")
+        command = [sys.executable, "-m", "benchmarks.bench_training", "--run", mode, data_path,
+                   "--chunk-size", str(chunk_size)]
+        if workers:
+            command += ["--workers", str(workers)]
+        result = subprocess.run(command, cwd=tmp, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main(rows=(1_000_000, 10_000_000, 50_000_000), in_memory_up_to=10_000_000, chunk_size=100000, workers=None):
+    from src.data_generator import write_synthetic_data
+
+    print(f"{'rows':>12} {'mode':>10} {'trained':>10} {'total':>10} {'peak RSS':>10} {'children':>10}")
+    for n in rows:
+        data_path = os.path.join(ROOT, "data", f"bench_{n}.csv")
+        if not os.path.exists(data_path):
+            write_synthetic_data(n, data_path, seed=42)
+
+        modes = ["in-memory", "streaming"] if n <= in_memory_up_to else ["streaming"]
+        for mode in modes:
+            stats = measure(mode, data_path, chunk_size, workers)
+            if stats is None:
+                print(f"{n:>12,} {mode:>10} {'failed (out of memory?)':>43}")
+                continue
+            print(f"{n:>12,} {mode:>10} {stats['trained_seconds']:>9.1f}s {stats['total_seconds']:>9.1f}s "
+                  f"{stats['peak_rss_mb']:>8,.0f}MB {stats['children_peak_rss_mb']:>8,.0f}MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000])
+    parser.add_argument("--in-memory-up-to", type=int, default=10_000_000,
+                        help="Largest dataset to also train in memory")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "DATA"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run[0], args.run[1], args.chunk_size, args.workers)
+    else:
+        main(args.rows, args.in_memory_up_to, args.chunk_size, args.workers)
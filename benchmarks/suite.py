@@ -0,0 +1,248 @@
+"""
+Reproducible benchmark suite for regression tracking.
+
+Builds fixed-seed corpora with src.data_generator, trains its own models on
+them in a temporary directory (so results do not depend on models/), and
+measures normalization, training time and memory, model load time,
+single-prediction latency and batch throughput through an in-process
+FastAPI test client, and explanation cost. Everything runs offline.
+
+Results are written as JSON with a stable layout: a "meta" block (commit,
+versions, sizes) and a flat "results" map of metric -> {value, unit,
+better}. Two result files can be diffed with --compare, which flags
+changes beyond a threshold in the worse direction and exits non-zero.
+
+Usage (from the repo root, after `pip install -r requirements-dev.txt`, as
+the test client needs httpx):
+    python -m benchmarks.suite -o benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.suite --quick
+    python -m benchmarks.suite --compare old.json new.json [--threshold 0.1]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+SIZES = {
+    "full": {"train_rows": 50000, "eval_rows": 20000, "requests": 1000, "batch_rows": 1000},
+    "quick": {"train_rows": 10000, "eval_rows": 5000, "requests": 200, "batch_rows": 500},
+}
+
+def corpus(num_rows, seed):
+    import pandas as pd
+    from src.data_generator import generate_synthetic_blocks
+    return pd.concat(list(generate_synthetic_blocks(num_rows, seed=seed, workers=1)), ignore_index=True)
+
+def timed(fn, repeat=3):
+    """
+    Best of `repeat` runs, in seconds, and the result of the last one.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class Results:
+    def __init__(self):
+        self.results = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.results[name] = {"value": round(float(value), 6), "unit": unit, "better": better}
+        print(f"  {name:<40} {value:>14,.3f} {unit}")
+
+def bench_training(results, train, tmp):
+    from src.model import TransactionClassifier
+
+    print("training")
+    paths = {}
+    for vectorizer, estimator in [("tfidf", "logistic"), ("hashing", "sgd")]:
+        classifier = TransactionClassifier(vectorizer, estimator)
+        classifier.pipeline = classifier.build_pipeline()
+        rss_before = peak_rss_mb()
+        seconds, _ = timed(lambda: classifier.pipeline.fit(train["description"], train["category"]))
+        name = f"train.{vectorizer}_{estimator}"
+        results.add(f"{name}.seconds", seconds, "s")
+        # Growth of the process high-water mark; only meaningful because
+        # training is the largest allocation made so far
+        results.add(f"{name}.peak_rss_growth_mb", max(peak_rss_mb() - rss_before, 0.0), "MB")
+
+        paths[vectorizer] = os.path.join(tmp, f"{vectorizer}.pkl")
+        classifier.save_model(paths[vectorizer])
+    results.add("train.peak_rss_mb", peak_rss_mb(), "MB")
+    return paths
+
+def bench_normalization(results, texts):
+    from src.preprocessing import normalize_text, normalize_batch
+
+    print("normalization")
+    per_row, _ = timed(lambda: [normalize_text(text) for text in texts])
+    batch, _ = timed(lambda: normalize_batch(texts))
+    results.add("normalize.per_row.us_per_row", per_row / len(texts) * 1e6, "us")
+    results.add("normalize.batch.us_per_row", batch / len(texts) * 1e6, "us")
+
+def bench_loading(results, model_path, tmp):
+    from src.model_store import export_mapped_model, export_model_file
+
+    print("model load")
+    seconds, classifier = timed(lambda: _load(model_path))
+    results.add("load.pickle.ms", seconds * 1000, "ms")
+
+    export_dir = os.path.join(tmp, "mmap")
+    export_mapped_model(classifier.pipeline, export_dir)
+    seconds, _ = timed(lambda: _load(export_dir))
+    results.add("load.mmap.ms", seconds * 1000, "ms")
+
+    export_file = os.path.join(tmp, "model.tcm")
+    export_model_file(classifier.pipeline, export_file)
+    seconds, _ = timed(lambda: _load(export_file))
+    results.add("load.tcm.ms", seconds * 1000, "ms")
+
+def _load(path):
+    from src.model import TransactionClassifier
+    classifier = TransactionClassifier()
+    classifier.load_model(path)
+    return classifier
+
+def bench_explanations(results, model_path, texts):
+    from src.explainability import Explainer
+
+    print("explanations")
+    classifier = _load(model_path)
+    explainer = Explainer(pipeline=classifier.pipeline)
+    single, _ = timed(lambda: [explainer.explain(text, top_k=5) for text in texts[:200]])
+    features = classifier.infer(texts, return_features=True).features
+    batch, _ = timed(lambda: explainer.explain_batch(texts, top_k=5, features=features))
+    results.add("explain.single.us_per_row", single / 200 * 1e6, "us")
+    results.add("explain.batch.us_per_row", batch / len(texts) * 1e6, "us")
+
+def bench_serving(results, model_path, texts, num_requests, batch_rows, tmp, seed):
+    # Settings are read when app.main is imported
+    os.environ.update({
+        "MODEL_PATH": model_path, "RELOAD_INTERVAL": "0", "PREDICTION_CACHE_SIZE": "0",
+        "FEEDBACK_DB": os.path.join(tmp, "feedback.db"), "KEYWORD_FAST_PATH": "1",
+    })
+    from fastapi.testclient import TestClient
+    import app.main as api
+
+    print("serving (in-process test client)")
+    rng = np.random.default_rng(seed)
+    requests = [texts[i] for i in rng.integers(len(texts), size=num_requests)]
+    matcher = api.keyword_matcher
+
+    with TestClient(api.app) as client:
+        for label, fast_path in [("model", None), ("keyword_fast_path", matcher)]:
+            api.keyword_matcher = fast_path
+            latencies = []
+            for text in requests:
+                start = time.perf_counter()
+                client.post("/predict", json={"description": text}).raise_for_status()
+                latencies.append(time.perf_counter() - start)
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+            results.add(f"predict.{label}.p50_ms", p50, "ms")
+            results.add(f"predict.{label}.p99_ms", p99, "ms")
+
+            payload = {"transactions": [{"description": text} for text in texts[:batch_rows]]}
+            seconds, _ = timed(lambda: client.post("/predict_batch", json=payload).raise_for_status())
+            results.add(f"predict_batch.{label}.rows_per_s", batch_rows / seconds, "rows/s", better="higher")
+        api.keyword_matcher = matcher
+
+    seconds, _ = timed(lambda: api.classifier.predict_batch(texts))
+    results.add("predict_batch.in_process.rows_per_s", len(texts) / seconds, "rows/s", better="higher")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(size="full", seed=42):
+    import sklearn
+
+    sizes = SIZES[size]
+    results = Results()
+    with tempfile.TemporaryDirectory() as tmp:
+        train = corpus(sizes["train_rows"], seed)
+        # Held-out corpus from a different seed
+        texts = corpus(sizes["eval_rows"], seed + 1)["description"].tolist()
+
+        bench_normalization(results, texts)
+        paths = bench_training(results, train, tmp)
+        bench_loading(results, paths["tfidf"], tmp)
+        bench_explanations(results, paths["tfidf"], texts)
+        bench_serving(results, paths["tfidf"], texts, sizes["requests"], sizes["batch_rows"], tmp, seed)
+
+    meta = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scikit-learn": sklearn.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "size": size,
+        **sizes,
+    }
+    return {"meta": meta, "results": results.results}
+
+def compare(old_path, new_path, threshold=0.1):
+    """
+    Prints every metric of two result files side by side. Returns the
+    number of metrics that got worse by more than `threshold`.
+    """
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    print(f"{'metric':<40} {'old':>14} {'new':>14} {'change':>8}")
+    regressions = 0
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        if name not in old["results"] or name not in new["results"]:
+            print(f"{name:<40} {'only in ' + ('new' if name in new['results'] else 'old'):>38}")
+            continue
+        before, after = old["results"][name], new["results"][name]
+        change = (after["value"] - before["value"]) / before["value"] if before["value"] else 0.0
+        worse = change > threshold if after["better"] == "lower" else change < -threshold
+        regressions += worse
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<40} {before['value']:>14,.3f} {after['value']:>14,.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproducible benchmark suite.")
+    parser.add_argument("-o", "--output", help="Write results JSON here (default: stdout only)")
+    parser.add_argument("--quick", action="store_true", help="Smaller corpora, for a fast check")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(*args.compare, threshold=args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    report = run("quick" if args.quick else "full", args.seed)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import asyncio
+
+# Queued by stop() behind the last item to predict
+_STOP = object()
+
+class MicroBatcher:
+    """
+    Coalesces single-item requests into batches for vectorized inference.
+
+    Requests that arrive within `window_ms` of the first queued one (or until
+    `max_batch` items are waiting) are passed to `predict_fn` as one list on
+    a worker thread, and each caller's future is resolved with its own result.
+    `predict_fn` must return one result per input, in order. stop() predicts
+    whatever is still queued before the worker exits, so no caller is left
+    waiting.
+    """
+    def __init__(self, predict_fn, window_ms=2.0, max_batch=256):
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = None
+        self._worker = None
+        self._stopping = False
+
+    async def start(self):
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops accepting items and returns once everything submitted before
+        has been predicted.
+        """
+        if self._worker is not None:
+            self._stopping = True
+            await self._queue.put((_STOP, None))
+            await self._worker
+            self._worker = None
+
+    async def submit(self, item):
+        if self._worker is None or self._stopping:
+            raise RuntimeError("MicroBatcher is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """
+        The next batch, and whether stop() was requested after it.
+        """
+        entry = await self._queue.get()
+        if entry[0] is _STOP:
+            return [], True
+        batch = [entry]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch:
+            try:
+                entry = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if entry[0] is _STOP:
+                return batch, True
+            batch.append(entry)
+
+        return batch, False
+
+    async def _predict(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(None, self.predict_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # The caller may have gone away (e.g. client disconnect)
+            if not future.done():
+                future.set_result(result)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._predict(batch)
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from src.preprocessing import normalize_text
+
+class PredictionCache:
+    """
+    Bounded LRU cache (with optional TTL) for prediction results.
+
+    Entries are keyed on the normalized description plus the version hash
+    of the model that produced them, so descriptions that only differ in
+    case or punctuation share an entry and a newly loaded model never sees
+    results from the previous one.
+    """
+    def __init__(self, max_size=100000, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, text, version=None):
+        """
+        Pass the version of the model that will compute the result, so that
+        a result racing a model swap can never be stored under the new model.
+        """
+        return (self.version if version is None else version, normalize_text(text))
+
+    def set_version(self, version):
+        """
+        Called whenever a model is (re)loaded. Entries from other versions
+        can never be hit again, so they are dropped straight away.
+        """
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key[0] != self.version:
+                # Computed by a model that has since been replaced
+                return
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
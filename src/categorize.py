@@ -0,0 +1,359 @@
+"""
+Streaming bulk categorization of CSV / NDJSON statement files.
+
+Input is read in chunks of `chunk_size` rows, each chunk goes through one
+vectorized inference call and the results are written out before the next
+chunk is read, so memory stays bounded regardless of the file size.
+
+CategorizeJob runs the same loop on a background thread and reports its
+progress, and JobCache keeps one job per (file content, model version), so
+interactive front ends never categorize the same upload twice.
+
+Usage:
+    python -m src.categorize statements.csv -o categorized.csv
+    python -m src.categorize statements.ndjson --format ndjson -o -
+"""
+import argparse
+import hashlib
+import io
+import os
+import sys
+import threading
+import time
+
+OUTPUT_COLUMNS = ["description", "amount", "category", "confidence"]
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def read_chunks(source, fmt="csv", chunk_size=10000):
+    """
+    Iterates over DataFrames of at most `chunk_size` rows from a path or file
+    object. Descriptions are always read as strings.
+    """
+    import pandas as pd
+
+    if fmt == "ndjson":
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype={"description": str})
+    return pd.read_csv(source, chunksize=chunk_size, dtype={"description": str})
+
+async def read_stream_records(stream, fmt="csv", chunk_size=10000):
+    """
+    Splits a body arriving as an async iterator of byte chunks (e.g.
+    Starlette's request.stream()) into records and yields (header, records)
+    as soon as `chunk_size` complete records are in, so nothing waits for
+    the whole upload. CSV records may span lines inside quoted fields; the
+    header is the first CSV record (None for NDJSON). A CSV body with only a
+    header yields it once with no records.
+    """
+    header = None
+    records, lines = [], []
+    in_quotes = False
+    partial = b""
+    yielded = False
+
+    def complete(line):
+        nonlocal header, in_quotes
+        lines.append(line)
+        # An odd number of quotes opens or closes a quoted field
+        if fmt == "csv" and line.count(b'"') % 2:
+            in_quotes = not in_quotes
+        if in_quotes:
+            return
+        record = b"\n".join(lines).rstrip(b"\r")
+        lines.clear()
+        if fmt == "csv" and header is None:
+            header = record
+        elif record.strip():
+            records.append(record)
+
+    async for data in stream:
+        pieces = (partial + data).split(b"\n")
+        partial = pieces.pop()
+        for line in pieces:
+            complete(line)
+        while len(records) >= chunk_size:
+            yield header, records[:chunk_size]
+            records = records[chunk_size:]
+            yielded = True
+
+    if partial:
+        complete(partial)
+    if lines:
+        # An unterminated quoted field, left for the parser to report
+        record = b"\n".join(lines)
+        if fmt == "csv" and header is None:
+            header = record
+        else:
+            records.append(record)
+    if fmt == "csv" and header is None:
+        import pandas as pd
+        raise pd.errors.EmptyDataError("No columns to parse from file")
+    if records or (fmt == "csv" and not yielded):
+        yield header, records
+
+def parse_records(header, records, fmt="csv"):
+    """
+    DataFrame of the records yielded by read_stream_records.
+    """
+    import pandas as pd
+
+    if fmt == "ndjson":
+        if not records:
+            return pd.DataFrame()
+        return pd.read_json(io.BytesIO(b"\n".join(records)), lines=True, dtype={"description": str})
+    return pd.read_csv(io.BytesIO(b"\n".join([header, *records])), dtype={"description": str})
+
+def categorize_chunks(chunks, predict_fn):
+    """
+    Applies `predict_fn` (a list of descriptions -> list of
+    {category, confidence} dicts) to each chunk and yields output frames.
+    """
+    import pandas as pd
+
+    for chunk in chunks:
+        if "description" not in chunk.columns:
+            raise ValueError("Input must contain a 'description' column")
+
+        descriptions = chunk["description"].fillna("").tolist()
+        preds = predict_fn(descriptions)
+
+        yield pd.DataFrame({
+            "description": descriptions,
+            "amount": pd.to_numeric(chunk["amount"], errors="coerce").astype(float).tolist() if "amount" in chunk.columns else None,
+            "category": [pred["category"] for pred in preds],
+            "confidence": [pred["confidence"] for pred in preds],
+        }, columns=OUTPUT_COLUMNS)
+
+def format_frame(frame, fmt="csv", header=True):
+    if fmt == "ndjson":
+        return frame.to_json(orient="records", lines=True, double_precision=15)
+    return frame.to_csv(index=False, header=header)
+
+def format_chunks(frames, fmt="csv"):
+    """
+    Serializes output frames to text, one piece per chunk (CSV header only on
+    the first one).
+    """
+    for i, frame in enumerate(frames):
+        yield format_frame(frame, fmt, header=(i == 0))
+
+class CategorizeJob:
+    """
+    Categorizes the CSV at `input_path` into `output_path` on a background
+    thread, `chunk_size` rows per `predict_fn` call. The output is written
+    chunk by chunk to a temporary file and renamed when complete, so an
+    existing `output_path` is always a finished result. `total_rows`, if
+    known, is used for `progress`.
+    """
+    def __init__(self, input_path, output_path, predict_fn, chunk_size=10000, total_rows=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.predict_fn = predict_fn
+        self.chunk_size = chunk_size
+        self.total_rows = total_rows
+        self.rows = 0
+        self.status = "pending"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+        self._cancelled = threading.Event()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows / self.total_rows, 1.0)
+
+    def start(self):
+        if self._thread is None:
+            self.status = "running"
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="categorize-job", daemon=True)
+            self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    def _run(self):
+        tmp_path = f"{self.output_path}.tmp"
+        try:
+            with open(tmp_path, "w", newline="") as out:
+                frames = categorize_chunks(read_chunks(self.input_path, "csv", self.chunk_size), self.predict_fn)
+                for i, frame in enumerate(frames):
+                    out.write(format_frame(frame, "csv", header=(i == 0)))
+                    self.rows += len(frame)
+                    if self._cancelled.is_set():
+                        self.status = "cancelled"
+                        break
+            if self.status == "cancelled":
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, self.output_path)
+                self.status = "done"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            self.finished_at = time.time()
+
+class JobCache:
+    """
+    One CategorizeJob per (file content, model version). Uploads and results
+    are stored in `directory` named by the SHA-256 of the upload, so asking
+    again for a file that is running or finished, in this process or a
+    previous one, returns that job instead of starting another.
+
+    Before each new job, files older than `max_age` seconds are deleted,
+    then the least recently used ones until the directory holds at most
+    `max_bytes` (None disables either limit). Files of running jobs are
+    never deleted.
+    """
+    def __init__(self, directory, chunk_size=10000, max_bytes=2 * 1024**3, max_age=7 * 24 * 3600):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_hash(data):
+        return hashlib.sha256(data).hexdigest()[:32]
+
+    def paths(self, file_hash, version):
+        return (
+            os.path.join(self.directory, f"{file_hash}.csv"),
+            os.path.join(self.directory, f"{file_hash}-{version}.categorized.csv"),
+        )
+
+    def get(self, file_hash, version):
+        """
+        The job for this file and model version, or None if there is none.
+        """
+        key = (file_hash, version)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.status in ("failed", "cancelled"):
+                input_path, output_path = self.paths(file_hash, version)
+                if not os.path.exists(output_path):
+                    return job
+                # Finished by an earlier process
+                job = self._jobs[key] = CategorizeJob(input_path, output_path, None)
+                job.status = "done"
+            return job
+
+    def submit(self, data, predict_fn, version):
+        """
+        Starts categorizing the CSV bytes `data` unless a job for the same
+        content and model version is running or finished. Returns the job.
+        """
+        file_hash = self.file_hash(data)
+        job = self.get(file_hash, version)
+        if job is not None and job.status == "running":
+            return job
+        if job is not None and job.status == "done":
+            # Marks the result as recently used for prune()
+            for path in (job.input_path, job.output_path):
+                if os.path.exists(path):
+                    os.utime(path)
+            return job
+
+        self.prune()
+        os.makedirs(self.directory, exist_ok=True)
+        input_path, output_path = self.paths(file_hash, version)
+        with open(input_path, "wb") as f:
+            f.write(data)
+        # Newlines inside quoted fields make this an estimate, enough for a progress bar
+        total_rows = max(data.count(b"\n") - 1 + (not data.endswith(b"\n")), 0)
+        job = CategorizeJob(input_path, output_path, predict_fn, self.chunk_size, total_rows)
+        with self._lock:
+            self._jobs[(file_hash, version)] = job
+        return job.start()
+
+    def prune(self):
+        """
+        Applies `max_age` and `max_bytes` to the stored files. Returns the
+        number of bytes freed.
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        with self._lock:
+            running = [job for job in self._jobs.values() if not job.done]
+            keep = {path for job in running for path in (job.input_path, f"{job.output_path}.tmp")}
+
+            files, total = [], 0
+            for entry in os.scandir(self.directory):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                total += stat.st_size
+                if entry.path not in keep:
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            freed = 0
+            now = time.time()
+            for mtime, size, path in sorted(files):
+                expired = self.max_age is not None and now - mtime > self.max_age
+                over = self.max_bytes is not None and total - freed > self.max_bytes
+                if not (expired or over):
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                freed += size
+
+            # Finished jobs whose results were deleted are run again if asked for
+            self._jobs = {
+                key: job for key, job in self._jobs.items()
+                if job.status != "done" or os.path.exists(job.output_path)
+            }
+            return freed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Categorize a CSV/NDJSON file of transactions in chunks.")
+    parser.add_argument("input", help="Input file with a 'description' column ('-' for stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--format", choices=sorted(MEDIA_TYPES), default="csv", help="Input and output format")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per inference call")
+    parser.add_argument("--model", default="models/model.pkl", help="Pickled model or memory-mapped export directory")
+    args = parser.parse_args(argv)
+
+    from src.model import TransactionClassifier
+    classifier = TransactionClassifier()
+    classifier.load_model(args.model)
+
+    source = sys.stdin if args.input == "-" else args.input
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+
+    rows = 0
+    try:
+        frames = categorize_chunks(
+            read_chunks(source, args.format, args.chunk_size),
+            lambda descriptions: classifier.predict_batch(descriptions, chunk_size=args.chunk_size)
+        )
+        for i, frame in enumerate(frames):
+            out.write(format_frame(frame, args.format, header=(i == 0)))
+            rows += len(frame)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Categorized {rows} transactions", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Columnar request and response bodies for batch prediction.
+
+Instead of one object per row, a batch is sent as parallel columns and the
+predictions come back as an array of category ids into a list of category
+names, plus an array of confidences, without echoing the descriptions and
+amounts. Three encodings:
+
+- json: {"description": [...], "amount": [...]} in, and
+  {"categories": [...], "category": [ids], "confidence": [...]} out, with
+  confidences rounded to float32 precision
+- ndjson: one {"description": ...} object per line in, one
+  {"category": ..., "confidence": ...} object per line out
+- arrow: an Arrow IPC stream with a "description" (and optional "amount")
+  column in, and a dictionary-encoded "category" and a float32
+  "confidence" column out (needs pyarrow)
+"""
+import importlib.util
+import io
+import json
+import numpy as np
+
+MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Decimal places kept for JSON confidences, about float32 precision
+CONFIDENCE_DIGITS = 7
+
+# Optional packages each format needs
+REQUIRES = {"arrow": "pyarrow"}
+
+def missing_dependency(fmt):
+    """
+    The package `fmt` needs that is not installed, or None.
+    """
+    package = REQUIRES.get(fmt)
+    if package is not None and importlib.util.find_spec(package) is None:
+        return package
+    return None
+
+def read_columns(body, fmt="json"):
+    """
+    Parses a request body into (descriptions, amounts). `amounts` is None
+    when the body has no amount column.
+    """
+    if fmt == "arrow":
+        import pyarrow as pa
+        table = pa.ipc.open_stream(body).read_all()
+        if "description" not in table.column_names:
+            raise ValueError("Input must contain a 'description' column")
+        amounts = table.column("amount").to_pylist() if "amount" in table.column_names else None
+        descriptions = table.column("description").to_pylist()
+    elif fmt == "ndjson":
+        rows = [json.loads(line) for line in body.splitlines() if line.strip()]
+        if any(not isinstance(row, dict) or "description" not in row for row in rows):
+            raise ValueError("Every line must be an object with a 'description' field")
+        descriptions = [row["description"] for row in rows]
+        amounts = [row.get("amount") for row in rows] if any("amount" in row for row in rows) else None
+    elif fmt == "json":
+        columns = json.loads(body)
+        if not isinstance(columns, dict) or not isinstance(columns.get("description"), list):
+            raise ValueError("Input must be an object with a 'description' array")
+        descriptions = columns["description"]
+        amounts = columns.get("amount")
+        if amounts is not None and len(amounts) != len(descriptions):
+            raise ValueError("'amount' must have one value per description")
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    return [text if isinstance(text, str) else "" for text in descriptions], amounts
+
+def to_columns(preds, classes=()):
+    """
+    Splits predict_cached results into (category names, category ids,
+    float32 confidences). Names start with `classes` in order, so ids are
+    stable for a model; categories from outside it (keyword or neighbour
+    matches) are appended.
+    """
+    index = {name: i for i, name in enumerate(classes)}
+    ids = np.fromiter((index.setdefault(pred["category"], len(index)) for pred in preds), dtype=np.int32, count=len(preds))
+    confidences = np.fromiter((pred["confidence"] for pred in preds), dtype=np.float32, count=len(preds))
+    return list(index), ids, confidences
+
+def write_columns(categories, ids, confidences, fmt="json"):
+    """
+    Encodes the output of to_columns as a response body (bytes).
+    """
+    if fmt == "arrow":
+        import pyarrow as pa
+        # One byte per row for the category while there are few of them
+        index_type = pa.int8() if len(categories) <= 127 else pa.int32()
+        table = pa.table({
+            "category": pa.DictionaryArray.from_arrays(pa.array(ids, index_type), pa.array(categories, pa.string())),
+            "confidence": pa.array(confidences, pa.float32()),
+        })
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+    rounded = np.round(confidences.astype(np.float64), CONFIDENCE_DIGITS).tolist()
+    if fmt == "ndjson":
+        # Each category's JSON prefix is encoded once, not once per row
+        prefixes = [f'{{"category":{json.dumps(name, ensure_ascii=False)},"confidence":' for name in categories]
+        return "".join(f"{prefixes[i]}{confidence}}}\n" for i, confidence in zip(ids.tolist(), rounded)).encode("utf-8")
+    if fmt == "json":
+        return json.dumps(
+            {"categories": categories, "category": ids.tolist(), "confidence": rounded},
+            ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+    raise ValueError(f"Unsupported format: {fmt}")
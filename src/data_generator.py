@@ -1,52 +1,197 @@
-import pandas as pd
 import random
 import yaml
 import os
+from src.parallel import map_ordered
+
+# Simulated noise around merchant keywords
+NOISE_TYPES = [
+    lambda k: k.upper(),
+    lambda k: k.lower(),
+    lambda k: f"POS {k} 1234",
+    lambda k: f"PAYPAL *{k}",
+    lambda k: f"{k} STORE NY",
+    lambda k: f"{k} #12345",
+    lambda k: f"TST* {k}",
+    lambda k: f"SQ *{k}",
+    lambda k: f"AMZN Mktp {k}",
+    lambda k: f"{k} .COM",
+    lambda k: f"CHECKCARD {k}",
+    lambda k: f"{k}",
+]
 
 def load_config(config_path="config/categories.yaml"):
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
 def generate_synthetic_data(num_samples=50000, output_path="data/transactions.csv"):
+    import pandas as pd
+
     config = load_config()
     categories = config["categories"]
-    
+
     data = []
-    
+
     for _ in range(num_samples):
         category = random.choice(categories)
         keyword = random.choice(category["keywords"])
-        
-        # Simulate noise
-        noise_types = [
-            lambda k: k.upper(),
-            lambda k: k.lower(),
-            lambda k: f"POS {k} 1234",
-            lambda k: f"PAYPAL *{k}",
-            lambda k: f"{k} STORE NY",
-            lambda k: f"{k} #12345",
-            lambda k: f"TST* {k}",
-            lambda k: f"SQ *{k}",
-            lambda k: f"AMZN Mktp {k}",
-            lambda k: f"{k} .COM",
-            lambda k: f"CHECKCARD {k}",
-            lambda k: f"{k}",
-        ]
-        
-        description = random.choice(noise_types)(keyword)
+
+        description = random.choice(NOISE_TYPES)(keyword)
         amount = round(random.uniform(5.0, 500.0), 2)
-        
+
         data.append({
             "description": description,
             "amount": amount,
             "category": category["name"],
             "category_id": category["id"]
         })
-        
+
     df = pd.DataFrame(data)
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     df.to_csv(output_path, index=False)
     print(f"Generated {num_samples} transactions at {output_path}")
 
+class _BlockSampler:
+    """
+    Precomputed lookup tables for vectorized sampling: every (keyword, noise)
+    description is rendered once, so a block of rows is just integer index
+    arithmetic and a take() on these arrays.
+    """
+    def __init__(self, config_path="config/categories.yaml"):
+        import numpy as np
+
+        categories = load_config(config_path)["categories"]
+        keywords = [(c, k) for c in categories for k in c["keywords"]]
+
+        self.names = np.array([c["name"] for c in categories], dtype=object)
+        self.ids = np.array([c["id"] for c in categories])
+        self.keyword_counts = np.array([len(c["keywords"]) for c in categories])
+        self.keyword_offsets = np.concatenate([[0], np.cumsum(self.keyword_counts)[:-1]])
+        self.descriptions = np.array(
+            [noise(k) for _, k in keywords for noise in NOISE_TYPES], dtype=object
+        )
+        # Pre-rendered CSV fragments around the amount column
+        self.csv_prefixes = np.array([_csv_field(d) + "," for d in self.descriptions], dtype=object)
+        self.csv_suffixes = np.array([f",{_csv_field(c['name'])},{c['id']}" for c in categories], dtype=object)
+
+    def sample_indices(self, seed, size):
+        import numpy as np
+
+        rng = np.random.default_rng(seed)
+        # Same distribution as generate_synthetic_data: uniform category, then
+        # uniform keyword within it, uniform noise pattern and amount
+        category = rng.integers(len(self.names), size=size)
+        keyword = self.keyword_offsets[category] + (rng.random(size) * self.keyword_counts[category]).astype(np.int64)
+        noise = rng.integers(len(NOISE_TYPES), size=size)
+        amount = np.round(rng.uniform(5.0, 500.0, size=size), 2)
+
+        return keyword * len(NOISE_TYPES) + noise, category, amount
+
+    def sample(self, seed, size):
+        import pandas as pd
+
+        description, category, amount = self.sample_indices(seed, size)
+        return pd.DataFrame({
+            "description": self.descriptions[description],
+            "amount": amount,
+            "category": self.names[category],
+            "category_id": self.ids[category],
+        })
+
+    def sample_csv(self, seed, size):
+        """
+        Same rows as sample(), rendered straight to headerless CSV text
+        without building a DataFrame.
+        """
+        description, category, amount = self.sample_indices(seed, size)
+        prefixes = self.csv_prefixes[description].tolist()
+        suffixes = self.csv_suffixes[category].tolist()
+        lines = [f"{p}{a:.2f}{s}\n" for p, a, s in zip(prefixes, amount.tolist(), suffixes)]
+        return "".join(lines)
+
+def _csv_field(value):
+    if any(c in value for c in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+_sampler = None
+
+def _init_worker(config_path):
+    global _sampler
+    _sampler = _BlockSampler(config_path)
+
+def _generate_block(task):
+    seed, size, fmt = task
+    # CSV is serialized in the worker too, which is most of the cost
+    if fmt == "csv":
+        return _sampler.sample_csv(seed, size)
+    return _sampler.sample(seed, size)
+
+def generate_synthetic_blocks(num_samples, seed=42, block_size=1_000_000, workers=None,
+                              fmt="frame", config_path="config/categories.yaml"):
+    """
+    Yields the dataset in blocks of `block_size` rows, sampled with NumPy
+    across `workers` processes (None = all cores, 1 = in-process). Block i is
+    seeded from SeedSequence(seed).spawn(...)[i], so the output depends only
+    on (seed, num_samples, block_size), not on the number of workers.
+    fmt="frame" yields DataFrames, fmt="csv" yields headerless CSV text.
+    """
+    import numpy as np
+
+    sizes = [min(block_size, num_samples - start) for start in range(0, num_samples, block_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, size, fmt) for s, size in zip(seeds, sizes)]
+
+    # Blocks come back in order, and only a few are in flight at once even
+    # when the consumer writes slower than the workers sample
+    yield from map_ordered(_generate_block, tasks, workers, _init_worker, (config_path,))
+
+def write_synthetic_data(num_samples, output_path, seed=42, block_size=1_000_000, workers=None,
+                         config_path="config/categories.yaml"):
+    """
+    Streams a reproducible synthetic dataset of any size to CSV or, for a
+    .parquet output path, Parquet (needs pyarrow, listed in requirements.txt).
+    Memory use is bounded by a few blocks regardless of `num_samples`.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    if output_path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet output requires pyarrow: pip install pyarrow, or write a .csv path instead")
+
+        writer = None
+        try:
+            for df in generate_synthetic_blocks(num_samples, seed, block_size, workers, "frame", config_path):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(output_path, "w", newline="") as f:
+            f.write("description,amount,category,category_id\n")
+            for text in generate_synthetic_blocks(num_samples, seed, block_size, workers, "csv", config_path):
+                f.write(text)
+
+    print(f"Generated {num_samples} transactions at {output_path}")
+
 if __name__ == "__main__":
-    generate_synthetic_data()
+    import argparse
+    parser = argparse.ArgumentParser(description="Generate synthetic transactions.")
+    parser.add_argument("--num-samples", type=int, default=50000)
+    parser.add_argument("--output", default="data/transactions.csv", help="CSV path, or .parquet for Parquet")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="Sample with NumPy in parallel blocks (reproducible via --seed)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=None, help="Processes for --vectorized (default: all cores)")
+    parser.add_argument("--block-size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if args.vectorized or args.output.endswith(".parquet"):
+        write_synthetic_data(args.num_samples, args.output, args.seed, args.block_size, args.workers)
+    else:
+        generate_synthetic_data(args.num_samples, args.output)
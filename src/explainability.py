@@ -1,49 +1,212 @@
-import shap
+import os
 import pickle
-import pandas as pd
-from src.preprocessing import normalize_text
+from collections import Counter
+import numpy as np
+from src.preprocessing import normalize_text, normalize_batch
+from src.model_store import MappedVectorizer, is_model_file, load_mapped_model, load_model_file
+
+class LinearAttribution:
+    """
+    Closed-form feature attributions for a linear model on TF-IDF features.
+
+    With an interventional background, the SHAP value of feature j towards
+    class c is simply coef[c, j] * (x_j - background_mean_j), so everything
+    except x is precomputed here once instead of on every request.
+    """
+    def __init__(self, vectorizer, classifier, background=None):
+        if background is None:
+            background = vectorizer.transform([" "])
+
+        self.coef = np.asarray(classifier.coef_)
+        self.intercept = np.asarray(classifier.intercept_)
+        self.classes = classifier.classes_
+        self.background_mean = np.asarray(background.mean(axis=0)).ravel()
+
+        # Hashed features have no names; their scores are folded back onto the
+        # words of the description instead (see attribute_words)
+        self.feature_names = None
+        self.count_features = None
+        if isinstance(vectorizer, MappedVectorizer):
+            # Kept as mapped (possibly UTF-8 encoded) rather than decoded
+            # once per process; only the words returned are decoded
+            self.feature_names = vectorizer.vocabulary
+        elif hasattr(vectorizer, "get_feature_names_out"):
+            self.feature_names = vectorizer.get_feature_names_out()
+        else:
+            self.count_features = vectorizer.count
+
+    def predict_index(self, features):
+        """
+        Index into `classes` of the predicted class for a single-row matrix.
+        """
+        scores = features @ self.coef.T + self.intercept
+        scores = np.asarray(scores).ravel()
+        if self.coef.shape[0] == 1:
+            return int(scores[0] > 0)
+        return int(np.argmax(scores))
+
+    def attribute(self, features, class_idx=None, top_k=None, text=None):
+        """
+        Returns [{word, score}, ...] for the non-zero features of a single-row
+        CSR matrix, sorted by contribution towards `class_idx`. `text` is only
+        needed for hashed features.
+        """
+        if class_idx is None:
+            class_idx = self.predict_index(features)
+        # Binary models only have a single coefficient row
+        row = class_idx if self.coef.shape[0] > 1 else 0
+
+        indices = features.indices
+        scores = self.coef[row, indices] * (features.data - self.background_mean[indices])
+
+        if self.feature_names is None:
+            words, scores = self.attribute_words(text, indices, scores)
+        else:
+            words = self.feature_words(indices)
+
+        order = np.argsort(-scores, kind="stable")
+        if top_k is not None:
+            order = order[:top_k]
+
+        return [{"word": words[i], "score": float(scores[i])} for i in order]
+
+    def feature_words(self, indices):
+        words = self.feature_names[indices].tolist()
+        if self.feature_names.dtype.kind == "S":
+            words = [word.decode("utf-8") for word in words]
+        return words
+
+    def attribute_words(self, text, indices, scores):
+        """
+        Folds per-feature scores of hashed character n-grams back onto the
+        words of `text`. Each n-gram comes from a single word, so a feature's
+        score is split across words by how many times each produced it.
+        """
+        occurrences = Counter(normalize_text(text).split())
+        if not occurrences:
+            return [], np.zeros(0)
+
+        words = list(occurrences)
+        multiplicity = np.array([occurrences[word] for word in words], dtype=float)
+        counts = self.count_features(words)[:, indices].multiply(multiplicity[:, None]).tocsr()
+
+        totals = np.asarray(counts.sum(axis=0)).ravel()
+        totals[totals == 0] = 1.0
+        return words, np.asarray(counts @ (scores / totals)).ravel()
+
+    def attribute_rows(self, features, top_k=None, texts=None, class_indices=None):
+        """
+        Attributions for every row of a CSR matrix, the same lists `attribute`
+        returns for each row. Predicted classes, scores and the per-row top-k
+        are computed over all non-zeros of the matrix at once; only building
+        the result dicts is per row. Hashed features are folded per row.
+        `class_indices` are the classes to explain, by default the ones
+        these coefficients predict.
+        """
+        if class_indices is None:
+            scores = features @ self.coef.T + self.intercept
+            if self.coef.shape[0] == 1:
+                class_indices = (np.asarray(scores).ravel() > 0).astype(int)
+            else:
+                class_indices = np.asarray(scores).argmax(axis=1)
+        class_indices = np.asarray(class_indices)
+
+        if self.feature_names is None:
+            return [
+                self.attribute(
+                    features[i], class_idx=int(class_indices[i]), top_k=top_k,
+                    text=texts[i] if texts is not None else None
+                )
+                for i in range(features.shape[0])
+            ]
+
+        indptr, indices = features.indptr, features.indices
+        counts = np.diff(indptr)
+        rows = np.repeat(np.arange(features.shape[0]), counts)
+        coef_rows = class_indices[rows] if self.coef.shape[0] > 1 else 0
+        contributions = self.coef[coef_rows, indices] * (features.data - self.background_mean[indices])
+
+        # Sorted by row, then by descending score; lexsort is stable, so ties
+        # keep feature order as in `attribute`
+        order = np.lexsort((-contributions, rows))
+        if top_k is not None:
+            rank = np.arange(len(order)) - indptr[rows[order]]
+            order = order[rank < top_k]
+            counts = np.minimum(counts, top_k)
+
+        words = self.feature_words(indices[order])
+        values = contributions[order].tolist()
+        bounds = np.concatenate(([0], np.cumsum(counts))).tolist()
+        return [
+            [{"word": word, "score": score} for word, score in zip(words[start:end], values[start:end])]
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
 
 class Explainer:
-    def __init__(self, model_path="models/model.pkl"):
-        with open(model_path, 'rb') as f:
-            self.pipeline = pickle.load(f)
-            
+    def __init__(self, model_path="models/model.pkl", pipeline=None):
+        """
+        Pass the `pipeline` already loaded by TransactionClassifier to share it
+        instead of loading the model file a second time.
+        """
+        if pipeline is None:
+            if os.path.isdir(model_path):
+                pipeline = load_mapped_model(model_path)
+            elif is_model_file(model_path):
+                pipeline = load_model_file(model_path)
+            else:
+                with open(model_path, 'rb') as f:
+                    pipeline = pickle.load(f)
+        self.pipeline = pipeline
+
         self.vectorizer = self.pipeline.named_steps['tfidf']
         self.classifier = self.pipeline.named_steps['clf']
-        
-    def explain(self, text):
-        # Create a masker for text
-        masker = shap.maskers.Text(r"\W+")
-        
-        # Create the explainer
-        # We need to pass the prediction function that takes raw text
-        # But SHAP for linear models usually works better with the coefficients directly
-        # For simplicity in this demo, we'll use the linear explainer on the transformed features
-        # Or we can use the generic Explainer which might be slower but easier to setup
-        
-        # Let's use the Linear explainer on the coefficients and feature names
-        # We need to transform the text first
-        
+        self.attribution = LinearAttribution(self.vectorizer, self.classifier)
+
+    def explain(self, text, top_k=None, features=None, class_idx=None):
+        """
+        `features` may be the single-row matrix already produced by
+        TransactionClassifier.infer, which skips a second TF-IDF transform.
+        Pass the index of the served prediction as `class_idx` when it comes
+        from another scorer (e.g. the float32 kernel), so the explanation is
+        for the label the caller sees.
+        """
+        if features is None:
+            clean_text = normalize_text(text)
+            features = self.vectorizer.transform([clean_text])
+        return self.attribution.attribute(features, class_idx=class_idx, top_k=top_k, text=text)
+
+    def explain_batch(self, texts, top_k=None, features=None, class_indices=None):
+        if features is None:
+            features = self.vectorizer.transform(normalize_batch(texts))
+        return self.attribution.attribute_rows(features, top_k=top_k, texts=texts, class_indices=class_indices)
+
+    def explain_shap(self, text):
+        """
+        Reference implementation using shap.LinearExplainer. Much slower than
+        `explain`, kept for parity checks against the closed-form engine.
+        """
+        import shap
+
         clean_text = normalize_text(text)
         features = self.vectorizer.transform([clean_text])
-        
+
         explainer = shap.LinearExplainer(
-            self.classifier, 
+            self.classifier,
             self.vectorizer.transform([" "]), # Background sample
             feature_perturbation="interventional"
         )
-        
+
         shap_values = explainer.shap_values(features)
-        
+
         # Map indices back to words
         feature_names = self.vectorizer.get_feature_names_out()
-        
+
         # Since it's multiclass, shap_values is a list of arrays OR a 3D array
         # We need to find the predicted class
         prediction = self.classifier.predict(features)[0]
         classes = self.classifier.classes_
         class_idx = list(classes).index(prediction)
-        
+
         if isinstance(shap_values, list):
             class_shap_values = shap_values[class_idx]
             # class_shap_values is (n_samples, n_features)
@@ -57,17 +220,16 @@ class Explainer:
             # Fallback or binary case (n_samples, n_features)
             class_shap_values = shap_values
             get_score = lambda idx: class_shap_values[0, idx]
-        
+
         # Get non-zero indices
-        import numpy as np
         indices = features.nonzero()[1]
-        
+
         explanation = []
         for idx in indices:
             word = feature_names[idx]
             score = get_score(idx)
             explanation.append({"word": word, "score": float(score)})
-            
+
         return sorted(explanation, key=lambda x: x["score"], reverse=True)
 
 if __name__ == "__main__":
@@ -0,0 +1,209 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    description TEXT NOT NULL,
+    correct_category TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (description, correct_category)
+)
+"""
+
+class FeedbackStore:
+    """
+    Append-only feedback store backed by SQLite in WAL mode.
+
+    add() only puts the correction on an in-memory queue; a background
+    writer thread drains the queue and inserts whole batches in a single
+    transaction. Repeated (description, category) pairs are stored once.
+    A batch that fails to write is kept and retried with a growing delay
+    until it succeeds, or dropped if it still fails once close() is called.
+    SQLite's locking makes this safe across several worker processes
+    sharing the same file, and WAL lets readers run alongside the writer.
+    """
+    def __init__(self, path="data/feedback.db", batch_size=500, flush_interval=0.5,
+                 retry_interval=1.0, max_retry_interval=30.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._queue = queue.Queue()
+        self._writer = None
+        self._stopping = threading.Event()
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            # Created on first use rather than on construction
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def start(self):
+        if self._writer is None:
+            self._stopping.clear()
+            self._writer = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+            self._writer.start()
+        return self
+
+    def close(self, timeout=None):
+        """
+        Stops the writer after everything queued so far has been written,
+        waiting at most `timeout` seconds. Returns the number of corrections
+        the writer had not got to by then, which are lost with the process.
+        """
+        if self._writer is None:
+            return 0
+        self._stopping.set()
+        self._writer.join(timeout)
+        unflushed = self.pending()
+        if self._writer.is_alive():
+            print(f"Feedback writer did not stop within {timeout:g}s, {unflushed} rows unwritten")
+        else:
+            self._writer = None
+        return unflushed
+
+    def add(self, description, correct_category, wait=False, timeout=None):
+        """
+        Queues one correction. With `wait`, blocks until it has been written
+        (at most `timeout` seconds) and returns whether it was.
+        """
+        written = threading.Event() if wait else None
+        self._queue.put(((description, correct_category, time.time()), written))
+        if written is None:
+            return None
+        if self._writer is None:
+            self.flush()
+        return written.wait(timeout)
+
+    def flush(self, timeout=None):
+        """
+        Blocks until every queued correction has been written, or at most
+        `timeout` seconds. Returns the number of corrections still unwritten.
+        """
+        if self._writer is None:
+            batch = self._drain()
+            while batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    # Put back for the next flush or the writer thread
+                    for entry in batch:
+                        self._queue.put(entry)
+                    raise
+                finally:
+                    self._done(batch)
+                self._written(batch)
+                batch = self._drain()
+            return 0
+        # Queue.join() with a deadline
+        with self._queue.all_tasks_done:
+            done = self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+        if done:
+            return 0
+        unflushed = self.pending()
+        print(f"Feedback flush timed out after {timeout:g}s, {unflushed} rows unwritten")
+        return unflushed
+
+    def pending(self):
+        """
+        Number of queued corrections not yet written (or dropped).
+        """
+        return self._queue.unfinished_tasks
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _done(self, batch):
+        for _ in batch:
+            self._queue.task_done()
+
+    def _written(self, batch):
+        for _, written in batch:
+            if written is not None:
+                written.set()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        conn = None
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO feedback (description, correct_category, created_at) VALUES (?, ?, ?)",
+                    [row for row, _ in batch]
+                )
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _run(self):
+        batch = []
+        delay = self.retry_interval
+        while batch or not (self._stopping.is_set() and self._queue.empty()):
+            if not batch:
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = [first] + self._drain()
+            try:
+                self._write(batch)
+                self._written(batch)
+            except Exception as e:
+                if not self._stopping.is_set():
+                    print(f"Failed to write {len(batch)} feedback rows, retrying in {delay:g}s: {e}")
+                    # Woken early by close(), which gets one last attempt
+                    self._stopping.wait(delay)
+                    delay = min(delay * 2, self.max_retry_interval)
+                    continue
+                print(f"Dropping {len(batch)} feedback rows on shutdown: {e}")
+            self._done(batch)
+            batch = []
+            delay = self.retry_interval
+
+    def read(self, after_id=0, limit=None):
+        """
+        Returns [(id, description, correct_category), ...] in insertion order.
+        Pass the last id seen as `after_id` to read incrementally.
+        """
+        sql = "SELECT id, description, correct_category FROM feedback WHERE id > ? ORDER BY id"
+        params = [after_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import yaml
+from src.preprocessing import normalize_text
+
+# Trie node key holding the categories of the keyword that ends at that node.
+# Never a token, since tokens come from str.split()
+END = ""
+
+class KeywordMatcher:
+    """
+    Fast path for descriptions that name a known merchant.
+
+    The keywords in categories.yaml are normalized like descriptions and
+    compiled into a trie over whole tokens, so "mart" never matches inside
+    "walmart". Matching walks the description once, taking the longest
+    keyword at each position ("amazon prime video" rather than "amazon"),
+    and it is a hit only if every keyword found belongs to one and the same
+    category. Keywords listed under several categories ("target", "gas",
+    "subway", "food") and keywords of different categories ("uber ...
+    store") are left to the model, as is everything without a keyword.
+
+    The YAML file is checked for changes at most every `check_interval`
+    seconds and recompiled when it changes.
+    """
+    def __init__(self, config_path="config/categories.yaml", check_interval=1.0):
+        self.config_path = config_path
+        self.check_interval = check_interval
+        self.version = None
+        self.keywords = 0
+        self.ambiguous = []
+        self.compiles = 0
+        self.lookups = 0
+        self.hits = 0
+        self.seconds = 0.0
+        self._trie = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def compile(self):
+        mtime = os.stat(self.config_path).st_mtime_ns
+        with open(self.config_path, "r") as f:
+            categories = yaml.safe_load(f)["categories"]
+
+        owners = {}
+        for category in categories:
+            for keyword in category["keywords"]:
+                tokens = tuple(normalize_text(keyword).split())
+                if tokens:
+                    owners.setdefault(tokens, set()).add(category["name"])
+
+        trie = {}
+        for tokens, names in owners.items():
+            node = trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[END] = frozenset(names)
+
+        # One reference swap, so concurrent matches see either trie whole
+        self._trie = trie
+        self.version = mtime
+        self.keywords = len(owners)
+        self.ambiguous = sorted(" ".join(tokens) for tokens, names in owners.items() if len(names) > 1)
+        self.compiles += 1
+
+    def refresh(self):
+        """
+        Recompiles if the YAML file changed since the last compile. Returns
+        True if it did.
+        """
+        now = time.monotonic()
+        if self._trie is not None and now < self._next_check:
+            return False
+        with self._lock:
+            if self._trie is not None and now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+            try:
+                changed = os.stat(self.config_path).st_mtime_ns != self.version
+            except OSError:
+                # Keep serving the last good compile if the file is mid-replace
+                return False
+            if changed:
+                self.compile()
+            return changed
+
+    def match(self, text):
+        """
+        (category, matched keywords) for a normalized description, or None.
+        """
+        trie = self._trie
+        tokens = text.split()
+        category = None
+        matched = []
+
+        skip = 0
+        for i, token in enumerate(tokens):
+            if skip:
+                skip -= 1
+                continue
+            node = trie.get(token)
+            if node is None:
+                continue
+
+            found, end = node.get(END), i + 1
+            for j in range(i + 1, len(tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                if END in node:
+                    found, end = node[END], j + 1
+            if found is None:
+                continue
+
+            # Ambiguous keywords defer to the model, as do keywords of
+            # different categories
+            if len(found) > 1 or (category is not None and found != category):
+                return None
+            category = found
+            matched.append(token if end == i + 1 else " ".join(tokens[i:end]))
+            skip = end - i - 1
+
+        if category is None:
+            return None
+        return next(iter(category)), matched
+
+    def match_batch(self, texts, normalized=False):
+        """
+        match() for each description; `normalized` skips normalize_text when
+        the caller already normalized them.
+        """
+        self.refresh()
+        start = time.perf_counter()
+        if not normalized:
+            texts = [normalize_text(text) for text in texts]
+        matches = [self.match(text) for text in texts]
+        elapsed = time.perf_counter() - start
+
+        hits = sum(match is not None for match in matches)
+        with self._lock:
+            self.lookups += len(matches)
+            self.hits += hits
+            self.seconds += elapsed
+        return matches
+
+    def stats(self):
+        return {
+            "version": self.version,
+            "keywords": self.keywords,
+            "ambiguous_keywords": self.ambiguous,
+            "compiles": self.compiles,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "avg_lookup_us": self.seconds / self.lookups * 1e6 if self.lookups else None,
+        }
@@ -1,23 +1,84 @@
-import pandas as pd
+import numpy as np
+import os
 import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
-import mlflow
-import mlflow.sklearn
-from src.preprocessing import normalize_text
+import hashlib
+import time
+from collections import namedtuple
+from src.metrics import STAGE_SECONDS
+from src.model_store import is_model_file, load_mapped_model, load_model_file
+
+Inference = namedtuple("Inference", ["labels", "confidences", "probabilities", "features"])
+
+VECTORIZERS = ["tfidf", "hashing"]
+ESTIMATORS = ["logistic", "sgd"]
 
 class TransactionClassifier:
-    def __init__(self):
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(preprocessor=normalize_text)),
-            ('clf', LogisticRegression(class_weight='balanced', max_iter=1000))
+    def __init__(self, vectorizer="tfidf", estimator="logistic"):
+        """
+        vectorizer: "tfidf" (word vocabulary) or "hashing" (hashed character
+        n-grams with IDF, fixed feature space and no vocabulary).
+        estimator: "logistic" (LogisticRegression) or "sgd" (log-loss
+        SGDClassifier, which supports partial_fit for online updates).
+        """
+        if vectorizer not in VECTORIZERS:
+            raise ValueError(f"Unknown vectorizer: {vectorizer}")
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator: {estimator}")
+        self.vectorizer = vectorizer
+        self.estimator = estimator
+        # Built on first train() or set by load_model(), so that serving never
+        # imports the training stack (sklearn estimators, mlflow, plotting)
+        self.pipeline = None
+        self.version = None
+        # Optional ScoringKernel used instead of the classifier's
+        # predict_proba, see compile_scoring()
+        self.scorer = None
+        # Background thread writing the last training run's plot and MLflow
+        # model, see src/training.py
+        self.report_thread = None
+
+    def build_pipeline(self):
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        from sklearn.pipeline import Pipeline
+        from src.vectorizer import NormalizingTfidfVectorizer, HashingTfidfVectorizer
+
+        if self.vectorizer == "hashing":
+            features = HashingTfidfVectorizer()
+        else:
+            features = NormalizingTfidfVectorizer(lowercase=False)
+
+        if self.estimator == "sgd":
+            # partial_fit does not support class_weight='balanced'
+            clf = SGDClassifier(loss='log_loss', alpha=1e-5, max_iter=20, tol=None, random_state=42)
+        else:
+            clf = LogisticRegression(class_weight='balanced', max_iter=1000)
+
+        # The features step keeps the 'tfidf' name for both variants
+        return Pipeline([
+            ('tfidf', features),
+            ('clf', clf)
         ])
         
-    def train(self, data_path="data/transactions.csv", test_size=0.2):
+    def train(self, data_path="data/transactions.csv", test_size=0.2, feedback_path=None):
+        """
+        feedback_path: optional FeedbackStore database whose corrections are
+        added to the training data.
+        """
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+        from sklearn.metrics import classification_report
+        import mlflow
+
+        if self.pipeline is None:
+            self.pipeline = self.build_pipeline()
+        self.scorer = None
+
         df = pd.read_csv(data_path)
+        if feedback_path and os.path.exists(feedback_path):
+            from src.feedback import FeedbackStore
+            rows = FeedbackStore(feedback_path).read()
+            feedback = pd.DataFrame(rows, columns=["id", "description", "category"])
+            df = pd.concat([df, feedback[["description", "category"]]], ignore_index=True)
         X = df['description']
         y = df['category']
         
@@ -25,7 +86,7 @@ class TransactionClassifier:
         
         mlflow.set_experiment("Transaction_Categorization")
         
-        with mlflow.start_run():
+        with mlflow.start_run() as run:
             print("Training model...")
             self.pipeline.fit(X_train, y_train)
             
@@ -37,56 +98,171 @@ class TransactionClassifier:
             mlflow.log_metric("accuracy", report["accuracy"])
             mlflow.log_metric("macro_f1", report["macro avg"]["f1-score"])
             
-            # Confusion Matrix
+            # Confusion matrix plot and model logging run in the background
             from sklearn.metrics import confusion_matrix
-            import matplotlib
-            matplotlib.use('Agg')
-            import matplotlib.pyplot as plt
-            import seaborn as sns
-            
-            cm = confusion_matrix(y_test, y_pred)
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=self.pipeline.classes_, yticklabels=self.pipeline.classes_)
-            plt.title('Confusion Matrix')
-            plt.ylabel('Actual')
-            plt.xlabel('Predicted')
-            plt.tight_layout()
-            plt.savefig('confusion_matrix.png')
-            mlflow.log_artifact('confusion_matrix.png')
-            
-            # Log model
-            mlflow.sklearn.log_model(self.pipeline, "model")
+            from src.training import start_report
+            cm = confusion_matrix(y_test, y_pred, labels=self.pipeline.classes_)
+            self.report_thread = start_report(run.info.run_id, cm, self.pipeline.classes_, self.pipeline)
             
             print(f"Accuracy: {report['accuracy']:.4f}")
             print(f"Macro F1: {report['macro avg']['f1-score']:.4f}")
             print("\nDetailed Report:")
             print(classification_report(y_test, y_pred))
+
+    def train_streaming(self, data_path="data/transactions.csv", test_size=0.2, chunk_size=100000,
+                        epochs=1, workers=None, feedback_path=None):
+        """
+        Out-of-core training for datasets that do not fit in memory (CSV or
+        Parquet), see src/training.py. Needs the fixed-size hashed feature
+        space and the SGD estimator. workers: featurization processes
+        (None = all cores); SGD fits its one-vs-rest classes in parallel too.
+        """
+        import mlflow
+        from src.training import train_out_of_core, classification_summary, start_report
+
+        if self.vectorizer != "hashing" or self.estimator != "sgd":
+            raise ValueError("Streaming training needs vectorizer='hashing' and estimator='sgd'")
+
+        if self.pipeline is None:
+            self.pipeline = self.build_pipeline()
+        self.scorer = None
+        self.pipeline.named_steps['clf'].set_params(n_jobs=-1)
+
+        mlflow.set_experiment("Transaction_Categorization")
+
+        with mlflow.start_run() as run:
+            mlflow.log_params({"streaming": True, "chunk_size": chunk_size, "epochs": epochs})
+            cm, classes = train_out_of_core(
+                self.pipeline, data_path, test_size=test_size, chunk_size=chunk_size,
+                epochs=epochs, workers=workers, feedback_path=feedback_path
+            )
+            report = classification_summary(cm, classes)
+
+            mlflow.log_metric("accuracy", report["accuracy"])
+            mlflow.log_metric("macro_f1", report["macro avg"]["f1-score"])
+            self.report_thread = start_report(run.info.run_id, cm, classes, self.pipeline)
+
+            print(f"Accuracy: {report['accuracy']:.4f}")
+            print(f"Macro F1: {report['macro avg']['f1-score']:.4f}")
+            print("\nDetailed Report:")
+            for name in classes:
+                row = report[name]
+                print(f"{name:>24} precision {row['precision']:.2f}  recall {row['recall']:.2f}  "
+                      f"f1 {row['f1-score']:.2f}  support {row['support']}")
             
     def save_model(self, path="models/model.pkl"):
-        with open(path, 'wb') as f:
+        # Written next to the target and renamed over it, so a server
+        # watching the path never reads a half-written model
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
             pickle.dump(self.pipeline, f)
+        os.replace(tmp_path, path)
             
     def load_model(self, path="models/model.pkl"):
+        self.scorer = None
+        if os.path.isdir(path):
+            # Memory-mapped export, see src/model_store.py
+            self.pipeline = load_mapped_model(path)
+            self.version = self.pipeline.version
+            return
+        if is_model_file(path):
+            # Single-file export, see src/model_store.py
+            self.pipeline = load_model_file(path)
+            self.version = self.pipeline.version
+            return
+
         with open(path, 'rb') as f:
-            self.pipeline = pickle.load(f)
+            data = f.read()
+        self.pipeline = pickle.loads(data)
+        # Identifies the loaded model, e.g. for cache keys
+        self.version = hashlib.sha256(data).hexdigest()[:16]
             
-    def predict(self, texts):
+    def infer(self, texts, return_features=False):
+        """
+        Single inference pass. The texts are normalized and vectorized once and
+        the same sparse matrix feeds predict_proba; labels come from the argmax
+        of the probabilities. With return_features the matrix is kept so the
+        explainer can reuse it instead of transforming again.
+        """
         if isinstance(texts, str):
             texts = [texts]
-        
-        probs = self.pipeline.predict_proba(texts)
-        preds = self.pipeline.predict(texts)
-        
+
+        start = time.perf_counter()
+        features = self.pipeline.named_steps['tfidf'].transform(texts)
+        transformed = time.perf_counter()
+        scorer = self.scorer if self.scorer is not None else self.pipeline.named_steps['clf']
+        probs = scorer.predict_proba(features)
+        best = probs.argmax(axis=1)
+        STAGE_SECONDS.observe(transformed - start, "transform")
+        STAGE_SECONDS.observe(time.perf_counter() - transformed, "predict_proba")
+
+        return Inference(
+            labels=self.pipeline.classes_[best],
+            confidences=probs[np.arange(len(best)), best],
+            probabilities=probs,
+            features=features if return_features else None,
+        )
+
+    def compile_scoring(self, dtype=np.float32, prune=0.0):
+        """
+        Scores with a float32 ScoringKernel (src/scoring.py) instead of the
+        classifier's predict_proba from now on, dropping features whose
+        weights are all within `prune` of zero. Retraining or loading another
+        model switches back to the classifier.
+        """
+        from src.scoring import ScoringKernel
+        self.scorer = ScoringKernel(self.pipeline.named_steps['clf'], dtype, prune)
+        return self.scorer
+
+    def predict(self, texts):
+        return self._format(self.infer(texts))
+
+    def predict_batch(self, texts, chunk_size=10000):
+        """
+        Vectorized prediction for many descriptions, one inference pass per
+        chunk of `chunk_size` rows.
+        """
+        texts = list(texts)
+
         results = []
-        for pred, prob in zip(preds, probs):
-            confidence = max(prob)
-            results.append({"category": pred, "confidence": float(confidence)})
-            
+        for start in range(0, len(texts), chunk_size):
+            results.extend(self._format(self.infer(texts[start:start + chunk_size])))
+
         return results
 
+    @staticmethod
+    def _format(inference):
+        return [
+            {"category": category, "confidence": confidence}
+            for category, confidence in zip(inference.labels.tolist(), inference.confidences.tolist())
+        ]
+
 if __name__ == "__main__":
-    import os
+    import argparse
+    parser = argparse.ArgumentParser(description="Train the transaction classifier.")
+    parser.add_argument("--vectorizer", choices=VECTORIZERS, default=None,
+                        help="Default: tfidf, or hashing with --streaming")
+    parser.add_argument("--estimator", choices=ESTIMATORS, default=None,
+                        help="Default: logistic, or sgd with --streaming")
+    parser.add_argument("--feedback", default=None, help="Feedback database to include, e.g. data/feedback.db")
+    parser.add_argument("--data", default="data/transactions.csv", help="Training data, CSV or Parquet")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Train out of core in chunks, for datasets larger than memory")
+    parser.add_argument("--chunk-size", type=int, default=100000, help="Rows per chunk with --streaming")
+    parser.add_argument("--epochs", type=int, default=1, help="Passes over the data with --streaming")
+    parser.add_argument("--workers", type=int, default=None, help="Featurization processes with --streaming (default: all cores)")
+    args = parser.parse_args()
+
     os.makedirs("models", exist_ok=True)
-    clf = TransactionClassifier()
-    clf.train()
+    clf = TransactionClassifier(
+        vectorizer=args.vectorizer or ("hashing" if args.streaming else "tfidf"),
+        estimator=args.estimator or ("sgd" if args.streaming else "logistic"),
+    )
+    if args.streaming:
+        clf.train_streaming(args.data, chunk_size=args.chunk_size, epochs=args.epochs,
+                            workers=args.workers, feedback_path=args.feedback)
+    else:
+        clf.train(args.data, feedback_path=args.feedback)
     clf.save_model()
+    print("Saved models/model.pkl")
+    # The process exits once the report thread has finished
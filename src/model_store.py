@@ -0,0 +1,390 @@
+"""
+Pickle-free model exports.
+
+A trained TF-IDF + LogisticRegression (or log-loss SGDClassifier) pipeline
+is exported either to a directory of .npy arrays (sorted vocabulary, IDF
+vector, coefficients, intercepts) plus a small meta.json, or to a single
+compact .tcm file holding the same arrays after a JSON header. Both load by memory-mapping the arrays
+read-only, so every worker process serving the same export shares one copy
+of them through the OS page cache instead of unpickling its own.
+
+Usage:
+    python -m src.model_store models/model.pkl models/model_mmap
+    python -m src.model_store models/model.pkl models/model.tcm
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import re
+import struct
+import sys
+from itertools import chain
+import numpy as np
+import scipy.sparse as sp
+from src.preprocessing import normalize_text, normalize_batch
+
+ARRAYS = ["vocabulary", "idf", "coef", "intercept"]
+
+def _check_supported(vectorizer):
+    from src.vectorizer import NormalizingTfidfVectorizer
+
+    if not hasattr(vectorizer, "vocabulary_"):
+        raise ValueError("Only vocabulary-based TF-IDF models can be exported")
+    normalizes = isinstance(vectorizer, NormalizingTfidfVectorizer) or vectorizer.preprocessor is normalize_text
+    if not normalizes or vectorizer.analyzer != "word" or vectorizer.stop_words is not None \
+            or vectorizer.tokenizer is not None or vectorizer.strip_accents is not None:
+        raise ValueError("Only word-level TF-IDF vectorizers using normalize_text can be exported")
+
+def _probability_link(classifier):
+    """
+    How the classifier turns scores into probabilities: "softmax" for
+    LogisticRegression, "ovr" (one-vs-rest sigmoids, normalized) for
+    log-loss SGDClassifier.
+    """
+    name = type(classifier).__name__
+    if name == "LogisticRegression":
+        return "softmax"
+    if name == "SGDClassifier" and classifier.loss == "log_loss":
+        return "ovr"
+    raise ValueError(f"Only LogisticRegression and log-loss SGDClassifier models can be exported, not {name}")
+
+def export_mapped_model(pipeline, directory):
+    vectorizer = pipeline.named_steps['tfidf']
+    classifier = pipeline.named_steps['clf']
+    _check_supported(vectorizer)
+    link = _probability_link(classifier)
+
+    vocabulary = vectorizer.get_feature_names_out().astype(str)
+    # Column i is the i-th term in sorted order, which lets the runtime look
+    # terms up with a binary search instead of a dict
+    if not np.all(vocabulary[:-1] < vocabulary[1:]):
+        raise ValueError("Vectorizer vocabulary is not in sorted column order")
+
+    arrays = {
+        "vocabulary": vocabulary,
+        "idf": np.ascontiguousarray(vectorizer.idf_) if vectorizer.use_idf else np.ones(len(vocabulary)),
+        "coef": np.ascontiguousarray(classifier.coef_),
+        "intercept": np.ascontiguousarray(classifier.intercept_),
+    }
+
+    # Every file is written aside and renamed over the old one, so workers
+    # that have the old arrays mapped keep reading them (truncating a mapped
+    # file crashes them), and meta.json, which reloads watch, comes last
+    os.makedirs(directory, exist_ok=True)
+    checksum = hashlib.sha256()
+    written = []
+    for name in ARRAYS:
+        tmp_path = os.path.join(directory, f"{name}.npy.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, arrays[name])
+        with open(tmp_path, 'rb') as f:
+            checksum.update(f.read())
+        written.append((tmp_path, os.path.join(directory, f"{name}.npy")))
+    for tmp_path, path in written:
+        os.replace(tmp_path, path)
+
+    meta = {
+        "classes": classifier.classes_.tolist(),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "binary": vectorizer.binary,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "norm": vectorizer.norm,
+        "link": link,
+        "checksum": checksum.hexdigest(),
+    }
+    meta_path = os.path.join(directory, "meta.json")
+    with open(f"{meta_path}.tmp", 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(f"{meta_path}.tmp", meta_path)
+
+    return meta
+
+class MappedVectorizer:
+    """
+    Reproduces TfidfVectorizer.transform from the exported arrays.
+    """
+    def __init__(self, vocabulary, idf, token_pattern, ngram_range=(1, 1),
+                 binary=False, sublinear_tf=False, norm="l2"):
+        self.vocabulary = vocabulary
+        self.idf_ = idf
+        self.token_pattern = re.compile(token_pattern)
+        self.ngram_range = tuple(ngram_range)
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+    def get_feature_names_out(self):
+        if self.vocabulary.dtype.kind == "S":
+            return np.char.decode(self.vocabulary, "utf-8")
+        return self.vocabulary
+
+    def _analyze(self, doc):
+        tokens = self.token_pattern.findall(doc)
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n + 1, len(tokens) + 1)):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def transform(self, raw_documents):
+        docs = [self._analyze(doc) for doc in normalize_batch(raw_documents)]
+        n_docs, n_features = len(docs), len(self.vocabulary)
+
+        terms = chain.from_iterable(docs)
+        if self.vocabulary.dtype.kind == "S":
+            # A .tcm vocabulary stays mapped as UTF-8 bytes; the batch's
+            # tokens are encoded to match instead
+            terms = np.array([term.encode("utf-8") for term in terms], dtype=bytes)
+        else:
+            terms = np.array(list(terms), dtype=str)
+        rows = np.repeat(np.arange(n_docs), [len(doc) for doc in docs])
+        if len(terms):
+            # Vectorized vocabulary lookup over every token in the batch
+            columns = np.minimum(np.searchsorted(self.vocabulary, terms), n_features - 1)
+            known = self.vocabulary[columns] == terms
+            rows, columns = rows[known], columns[known]
+        else:
+            columns = rows
+
+        X = sp.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)), shape=(n_docs, n_features)
+        )
+        X.sum_duplicates()
+
+        if self.binary:
+            X.data[:] = 1.0
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X.data *= self.idf_[X.indices]
+        if self.norm is not None:
+            _normalize_rows(X, self.norm)
+
+        return X
+
+def _normalize_rows(X, norm):
+    """
+    In-place row normalization of a CSR matrix, the same arithmetic as
+    sklearn.preprocessing.normalize without importing sklearn.
+    """
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    if norm == "l2":
+        norms = np.sqrt(np.bincount(rows, weights=X.data * X.data, minlength=X.shape[0]))
+    elif norm == "l1":
+        norms = np.bincount(rows, weights=np.abs(X.data), minlength=X.shape[0])
+    else:
+        raise ValueError(f"Unsupported norm: {norm}")
+    norms[norms == 0.0] = 1.0
+    X.data /= norms[rows]
+
+class MappedLinearClassifier:
+    """
+    Linear model inference from the exported coefficient arrays, with
+    LogisticRegression's softmax or, with `ovr`, the normalized one-vs-rest
+    sigmoids of a log-loss SGDClassifier.
+    """
+    def __init__(self, coef, intercept, classes, ovr=False):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+        self.ovr = ovr
+
+    def decision_function(self, X):
+        scores = X @ self.coef_.T + self.intercept_
+        return scores.ravel() if scores.shape[1] == 1 else scores
+
+    def predict_proba(self, X):
+        from scipy.special import expit
+
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            positive = expit(scores) if self.ovr else 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1 - positive, positive])
+
+        if self.ovr:
+            # Same steps as sklearn's LinearClassifierMixin._predict_proba_lr
+            scores = expit(scores)
+            totals = scores.sum(axis=1)
+            empty = totals == 0
+            scores[empty] = 1
+            totals[empty] = scores.shape[1]
+            scores /= totals[:, None]
+            return scores
+
+        # Same steps as sklearn.utils.extmath.softmax
+        scores = scores - scores.max(axis=1, keepdims=True)
+        np.exp(scores, scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X):
+        scores = self.decision_function(X)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+class MappedPipeline:
+    """
+    Exposes the parts of the sklearn Pipeline API that TransactionClassifier
+    and Explainer use (named_steps, classes_, predict, predict_proba).
+    """
+    def __init__(self, vectorizer, classifier, version=None):
+        self.named_steps = {'tfidf': vectorizer, 'clf': classifier}
+        self.classes_ = classifier.classes_
+        self.version = version
+
+    def predict_proba(self, texts):
+        return self.named_steps['clf'].predict_proba(self.named_steps['tfidf'].transform(texts))
+
+    def predict(self, texts):
+        return self.named_steps['clf'].predict(self.named_steps['tfidf'].transform(texts))
+
+def load_mapped_model(directory):
+    with open(os.path.join(directory, "meta.json")) as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r')
+        for name in ARRAYS
+    }
+
+    vectorizer = MappedVectorizer(
+        arrays["vocabulary"], arrays["idf"], meta["token_pattern"],
+        ngram_range=meta["ngram_range"], binary=meta["binary"],
+        sublinear_tf=meta["sublinear_tf"], norm=meta["norm"]
+    )
+    classifier = MappedLinearClassifier(
+        arrays["coef"], arrays["intercept"], np.array(meta["classes"]),
+        ovr=meta.get("link") == "ovr"
+    )
+    return MappedPipeline(vectorizer, classifier, version=meta["checksum"][:16])
+
+# Single-file format: MAGIC, a little-endian uint32 header length, the JSON
+# header, then each array's raw bytes at the (64-byte aligned) offset the
+# header gives, counted from the end of the header
+MAGIC = b"TXNMODL1"
+ALIGNMENT = 64
+
+def is_model_file(path):
+    if not os.path.isfile(path):
+        return False
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def _config_hash(config_path):
+    if config_path is None or not os.path.exists(config_path):
+        return None
+    with open(config_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+def export_model_file(pipeline, path, dtype=np.float32, config_path="config/categories.yaml"):
+    """
+    Writes the pipeline as one .tcm file. IDF and coefficients are stored as
+    contiguous `dtype` arrays (float32 halves the size; float64 reproduces
+    the pickle bit for bit). The header carries the class labels, the
+    vectorizer settings, a hash of the category config at `config_path` as
+    it is at export time and a SHA-256 checksum of the array data.
+    """
+    vectorizer = pipeline.named_steps['tfidf']
+    classifier = pipeline.named_steps['clf']
+    _check_supported(vectorizer)
+    link = _probability_link(classifier)
+
+    vocabulary = vectorizer.get_feature_names_out().astype(str)
+    if not np.all(vocabulary[:-1] < vocabulary[1:]):
+        raise ValueError("Vectorizer vocabulary is not in sorted column order")
+    idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(vocabulary))
+    arrays = {
+        # UTF-8 rather than numpy's 4-bytes-per-character unicode; byte order
+        # is code point order, so the array stays sorted
+        "vocabulary": np.char.encode(vocabulary, "utf-8"),
+        "idf": np.ascontiguousarray(idf, dtype=dtype),
+        "coef": np.ascontiguousarray(classifier.coef_, dtype=dtype),
+        "intercept": np.ascontiguousarray(classifier.intercept_, dtype=dtype),
+    }
+
+    layout = {}
+    payload = bytearray()
+    for name in ARRAYS:
+        payload.extend(b"\0" * (-len(payload) % ALIGNMENT))
+        layout[name] = {"dtype": arrays[name].dtype.str, "shape": list(arrays[name].shape), "offset": len(payload)}
+        payload.extend(arrays[name].tobytes())
+
+    header = {
+        "format": 1,
+        "classes": classifier.classes_.tolist(),
+        "token_pattern": vectorizer.token_pattern,
+        "ngram_range": list(vectorizer.ngram_range),
+        "binary": vectorizer.binary,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "norm": vectorizer.norm,
+        "link": link,
+        "config_hash": _config_hash(config_path),
+        "arrays": layout,
+        "checksum": hashlib.sha256(payload).hexdigest(),
+    }
+    encoded = json.dumps(header).encode("utf-8")
+    # Pad the header so the array data starts aligned in the file
+    encoded += b" " * (-(len(MAGIC) + 4 + len(encoded)) % ALIGNMENT)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return header
+
+def load_model_file(path, verify=True):
+    """
+    Maps a .tcm file read-only and returns a MappedPipeline over it. With
+    `verify`, the array data is checked against the header's checksum.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a model file")
+        header_size, = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_size))
+        if header["format"] != 1:
+            raise ValueError(f"Unsupported model file format: {header['format']}")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    start = len(MAGIC) + 4 + header_size
+    if verify and hashlib.sha256(memoryview(data)[start:]).hexdigest() != header["checksum"]:
+        raise ValueError(f"{path} is corrupt: checksum mismatch")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=start + spec["offset"]).reshape(spec["shape"])
+
+    vectorizer = MappedVectorizer(
+        arrays["vocabulary"], arrays["idf"], header["token_pattern"],
+        ngram_range=header["ngram_range"], binary=header["binary"],
+        sublinear_tf=header["sublinear_tf"], norm=header["norm"]
+    )
+    classifier = MappedLinearClassifier(
+        arrays["coef"], arrays["intercept"], np.array(header["classes"]), ovr=header["link"] == "ovr"
+    )
+    pipeline = MappedPipeline(vectorizer, classifier, version=header["checksum"][:16])
+    pipeline.config_hash = header["config_hash"]
+    return pipeline
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "models/model.pkl"
+    target = sys.argv[2] if len(sys.argv) > 2 else "models/model_mmap"
+    with open(source, 'rb') as f:
+        pipeline = pickle.load(f)
+    if target.endswith(".tcm"):
+        meta = export_model_file(pipeline, target)
+    else:
+        meta = export_mapped_model(pipeline, target)
+    print(f"Exported {source} to {target} (checksum {meta['checksum'][:16]})")
@@ -0,0 +1,389 @@
+"""
+Nearest-merchant fallback for low-confidence predictions.
+
+The labelled descriptions of the training data (and FeedbackStore
+corrections, which override them) are normalized, deduplicated and embedded
+once with a sentence-transformers model on CPU into a NeighborIndex saved as
+.npz. At serving time, descriptions the classifier is unsure about are
+embedded and matched against it by cosine similarity, a single matrix
+product and a partial sort in NumPy, and the best-supported label among the
+nearest neighbours replaces the model's when it is similar enough.
+
+Embeddings are computed in batches and cached on disk in SQLite, keyed on
+model name and normalized text, so rebuilding the index or seeing a
+description again never re-embeds it. At serving time a bounded in-memory
+LRU sits in front of the disk cache, new embeddings are written to disk in
+batches by a background thread, and the disk cache keeps only the most
+recently written rows.
+
+Usage:
+    python -m src.neighbors --data data/transactions.csv --feedback data/feedback.db
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+import numpy as np
+from src.preprocessing import normalize_batch
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    PRIMARY KEY (model, text)
+)
+"""
+
+# Host parameters per SQLite statement stay below the default limit of 999
+LOOKUP_CHUNK = 500
+
+class EmbeddingCache:
+    """
+    Float32 embeddings on disk, keyed on (model name, normalized text). With
+    `max_rows`, rows older than the newest `max_rows` inserts are deleted
+    after each write.
+    Each thread keeps its own connection open.
+    """
+    def __init__(self, path="models/embeddings.db", max_rows=None):
+        self.path = path
+        self.max_rows = max_rows
+        self._initialized = False
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+        conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+        return conn
+
+    def get(self, model, texts):
+        """
+        Returns {text: vector} for the texts that are cached.
+        """
+        found = {}
+        conn = self._connect()
+        for start in range(0, len(texts), LOOKUP_CHUNK):
+            chunk = texts[start:start + LOOKUP_CHUNK]
+            rows = conn.execute(
+                f"SELECT text, vector FROM embeddings WHERE model = ? AND text IN ({','.join('?' * len(chunk))})",
+                [model, *chunk]
+            )
+            for text, vector in rows:
+                found[text] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put(self, model, texts, vectors):
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector) VALUES (?, ?, ?)",
+                [(model, text, np.asarray(vector, dtype=np.float32).tobytes()) for text, vector in zip(texts, vectors)]
+            )
+            if self.max_rows is not None:
+                # Rowids grow with every insert, so the smallest are the oldest.
+                # Cutting at a rowid is a range delete on the table's own
+                # B-tree, unlike counting the rows on every write, and holds
+                # across processes sharing the file. Replaced rows leave gaps,
+                # so the cache can end up a little below max_rows.
+                newest = conn.execute("SELECT MAX(rowid) FROM embeddings").fetchone()[0] or 0
+                if newest > self.max_rows:
+                    conn.execute("DELETE FROM embeddings WHERE rowid <= ?", (newest - self.max_rows,))
+
+class Embedder:
+    """
+    Unit-length sentence embeddings of normalized texts on CPU. The model is
+    loaded on first use; sentence-transformers (and torch) are only imported
+    then.
+
+    For serving, `memory_size` keeps that many recent embeddings in an
+    in-memory LRU in front of the disk cache, `defer_writes` moves disk
+    writes to a background thread that writes every `flush_interval`
+    seconds in one transaction, and `cache_rows` caps the disk cache.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL, cache_path="models/embeddings.db", batch_size=256,
+                 memory_size=0, defer_writes=False, flush_interval=1.0, cache_rows=None):
+        self.model_name = model_name
+        self.cache = EmbeddingCache(cache_path, cache_rows) if cache_path else None
+        self.batch_size = batch_size
+        self.memory_size = memory_size
+        self.defer_writes = defer_writes
+        self.flush_interval = flush_interval
+        self.encoded = 0
+        self._model = None
+        self._lock = threading.Lock()
+        # Guards the counter, the LRU and the pending writes
+        self._state_lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._unwritten = []
+        self._writer = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name, device="cpu")
+        return self._model
+
+    def encode(self, texts):
+        vectors = self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+        with self._state_lock:
+            self.encoded += len(texts)
+        return vectors.astype(np.float32, copy=False)
+
+    def _recall(self, texts):
+        found = {}
+        if self.memory_size:
+            with self._state_lock:
+                for text in texts:
+                    vector = self._memory.get(text)
+                    if vector is not None:
+                        self._memory.move_to_end(text)
+                        found[text] = vector
+        return found
+
+    def _remember(self, items):
+        if self.memory_size:
+            with self._state_lock:
+                for text, vector in items:
+                    self._memory[text] = vector
+                    self._memory.move_to_end(text)
+                while len(self._memory) > self.memory_size:
+                    self._memory.popitem(last=False)
+
+    def _store(self, texts, vectors):
+        if not self.defer_writes:
+            self.cache.put(self.model_name, texts, vectors)
+            return
+        with self._state_lock:
+            self._unwritten.extend(zip(texts, vectors))
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_behind, name="embedding-writer", daemon=True)
+                self._writer.start()
+
+    def _write_behind(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                # Only a cache: the rows are dropped, and re-embedded if
+                # they are needed again after leaving the LRU
+                print(f"Failed to cache embeddings: {e}")
+
+    def flush(self):
+        """
+        Writes the embeddings whose disk writes were deferred.
+        """
+        with self._state_lock:
+            pending, self._unwritten = self._unwritten, []
+        if pending and self.cache:
+            texts, vectors = zip(*pending)
+            self.cache.put(self.model_name, list(texts), vectors)
+
+    def embed(self, texts):
+        """
+        Embeddings of already normalized `texts`, one row each. Only texts
+        missing from the in-memory and disk caches are encoded, in batches of
+        `batch_size`.
+        """
+        unique = list(dict.fromkeys(texts))
+        found = self._recall(unique)
+        missing = [text for text in unique if text not in found]
+        if missing and self.cache:
+            stored = self.cache.get(self.model_name, missing)
+            self._remember(stored.items())
+            found.update(stored)
+            missing = [text for text in missing if text not in stored]
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            vectors = self.encode(batch)
+            if self.cache:
+                self._store(batch, vectors)
+            self._remember(zip(batch, vectors))
+            found.update(zip(batch, vectors))
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[text] for text in texts])
+
+class NeighborIndex:
+    """
+    Embeddings of labelled, normalized merchant descriptions and their
+    categories, searched by cosine similarity.
+    """
+    def __init__(self, vectors, labels, texts, embedder):
+        self.vectors = vectors
+        self.labels = labels
+        self.texts = texts
+        self.embedder = embedder
+        self.classes, self.label_indices = np.unique(labels, return_inverse=True)
+
+    @classmethod
+    def build(cls, data_path="data/transactions.csv", feedback_path=None, embedder=None, chunk_size=100000):
+        from src.training import read_training_chunks
+        embedder = embedder or Embedder()
+
+        # Most frequent category per normalized description; corrections win
+        votes = {}
+        for texts, labels in read_training_chunks(data_path, chunk_size):
+            for text, label in zip(normalize_batch(texts), labels):
+                if text:
+                    votes.setdefault(text, Counter())[label] += 1
+        labelled = {text: counts.most_common(1)[0][0] for text, counts in votes.items()}
+        if feedback_path and os.path.exists(feedback_path):
+            from src.feedback import FeedbackStore
+            rows = FeedbackStore(feedback_path).read()
+            for text, label in zip(normalize_batch([row[1] for row in rows]), [row[2] for row in rows]):
+                if text:
+                    labelled[text] = label
+
+        texts = sorted(labelled)
+        labels = np.array([labelled[text] for text in texts])
+        return cls(embedder.embed(texts), labels, np.array(texts), embedder)
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, vectors=self.vectors, labels=self.labels, texts=self.texts,
+                 model_name=np.array(self.embedder.model_name))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, cache_path="models/embeddings.db", **embedder_options):
+        """
+        `embedder_options` (memory_size, defer_writes, ...) are passed on to
+        the Embedder.
+        """
+        with np.load(path) as data:
+            embedder = Embedder(str(data["model_name"]), cache_path=cache_path, **embedder_options)
+            return cls(data["vectors"], data["labels"], data["texts"], embedder)
+
+    def search(self, texts, k=5):
+        """
+        For each normalized text, (label, similarity, neighbours): the label
+        with the largest summed similarity among the `k` nearest entries, its
+        best similarity, and the neighbours as [(text, label, similarity)].
+        """
+        if not texts:
+            return []
+        k = min(k, len(self.labels))
+        similarities = self.embedder.embed(texts) @ self.vectors.T
+        # Partial sort for the top k, then order only those
+        nearest = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        nearest_similarities = np.take_along_axis(similarities, nearest, axis=1)
+        order = np.argsort(-nearest_similarities, axis=1, kind="stable")
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        nearest_similarities = np.take_along_axis(nearest_similarities, order, axis=1)
+
+        # Similarity-weighted vote per class, for all rows at once
+        support = np.zeros((len(texts), len(self.classes)))
+        rows = np.repeat(np.arange(len(texts)), k)
+        np.add.at(support, (rows, self.label_indices[nearest].ravel()), nearest_similarities.ravel())
+        winners = support.argmax(axis=1)
+        best = np.where(self.label_indices[nearest] == winners[:, None], nearest_similarities, -np.inf).max(axis=1)
+
+        return [
+            (
+                str(self.classes[winner]), float(similarity),
+                [(str(self.texts[j]), str(self.labels[j]), float(s)) for j, s in zip(row, row_similarities)]
+            )
+            for winner, similarity, row, row_similarities in zip(winners, best, nearest, nearest_similarities)
+        ]
+
+class NeighborFallback:
+    """
+    Confidence gate in front of a NeighborIndex: predictions below
+    `confidence` are looked up, and the neighbours' label is used when its
+    similarity reaches `min_similarity`.
+    """
+    def __init__(self, index, confidence=0.6, min_similarity=0.8, k=5):
+        self.index = index
+        self.confidence = confidence
+        self.min_similarity = min_similarity
+        self.k = k
+        self.rows = 0
+        self.lookups = 0
+        self.accepted = 0
+        self.calls = 0
+        self.seconds = 0.0
+        # Requests call apply() from several threads at once
+        self._lock = threading.Lock()
+
+    def apply(self, texts, confidences):
+        """
+        Returns {position: (label, similarity, neighbours)} for the
+        predictions of `texts` the neighbours override.
+        """
+        positions = [i for i, confidence in enumerate(confidences) if confidence < self.confidence]
+        if not positions:
+            with self._lock:
+                self.rows += len(texts)
+            return {}
+
+        start = time.perf_counter()
+        matches = self.index.search([texts[i] for i in positions], k=self.k)
+        seconds = time.perf_counter() - start
+
+        overrides = {i: match for i, match in zip(positions, matches) if match[1] >= self.min_similarity}
+        with self._lock:
+            self.rows += len(texts)
+            self.seconds += seconds
+            self.calls += 1
+            self.lookups += len(positions)
+            self.accepted += len(overrides)
+        return overrides
+
+    def stats(self):
+        return {
+            "entries": len(self.index.labels),
+            "model_name": self.index.embedder.model_name,
+            "confidence": self.confidence,
+            "min_similarity": self.min_similarity,
+            "rows": self.rows,
+            "lookups": self.lookups,
+            "accepted": self.accepted,
+            "fallback_rate": self.lookups / self.rows if self.rows else 0.0,
+            "accept_rate": self.accepted / self.lookups if self.lookups else 0.0,
+            "avg_lookup_ms": self.seconds / self.calls * 1000 if self.calls else 0.0,
+            "embedded": self.index.embedder.encoded,
+        }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the nearest-merchant index.")
+    parser.add_argument("--data", default="data/transactions.csv", help="Labelled CSV or Parquet file")
+    parser.add_argument("--feedback", default=None, help="FeedbackStore database whose corrections are added")
+    parser.add_argument("--output", default="models/merchant_index.npz")
+    parser.add_argument("--model-name", default=DEFAULT_MODEL, help="sentence-transformers model")
+    parser.add_argument("--cache", default="models/embeddings.db", help="Embedding cache database")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    embedder = Embedder(args.model_name, cache_path=args.cache, batch_size=args.batch_size)
+    index = NeighborIndex.build(args.data, args.feedback, embedder)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    index.save(args.output)
+    print(f"Indexed {len(index.labels)} descriptions ({embedder.encoded} newly embedded) "
+          f"in {time.perf_counter() - start:.1f}s to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import copy
+import queue
+import threading
+import time
+from src.model import TransactionClassifier
+
+class OnlineLearner:
+    """
+    Folds feedback corrections into the live model without a full retrain.
+
+    Corrections are queued until `batch_size` of them are pending, then a copy
+    of the current pipeline is updated with one partial_fit call on that
+    mini-batch and returned as a new TransactionClassifier, ready to be
+    swapped in. The model being served is never mutated in place.
+
+    Servers start() a background worker and submit() corrections to it, so
+    requests never wait on the copy and partial_fit. The worker updates at
+    most once every `min_interval` seconds, folding everything that queued up
+    meanwhile into one partial_fit, and hands each new model to `on_update`.
+    """
+    def __init__(self, classifier, batch_size=32, min_interval=0.0, on_update=None):
+        self.classifier = classifier
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self.on_update = on_update
+        self.base_version = classifier.version
+        self.updates = 0
+        self.samples = 0
+        self.skipped = 0
+        self.last_update_seconds = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._stopping = threading.Event()
+
+    @staticmethod
+    def supports(classifier):
+        return classifier.pipeline is not None and hasattr(classifier.pipeline.named_steps['clf'], "partial_fit")
+
+    def _accept(self, description, category):
+        # partial_fit cannot introduce new classes
+        if category not in self.classifier.pipeline.classes_:
+            self.skipped += 1
+            return
+        self._pending.append((description, category))
+
+    def add(self, description, category):
+        """
+        Queues one correction. Returns the updated TransactionClassifier when
+        this completes a mini-batch, None otherwise.
+        """
+        with self._lock:
+            self._accept(description, category)
+            if len(self._pending) < self.batch_size:
+                return None
+
+            batch, self._pending = self._pending, []
+            return self._update(batch)
+
+    def start(self):
+        if self._worker is None:
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name="online-learner", daemon=True)
+            self._worker.start()
+        return self
+
+    def stop(self):
+        if self._worker is not None:
+            self._stopping.set()
+            self._worker.join()
+            self._worker = None
+
+    def submit(self, description, category):
+        """
+        Hands one correction to the background worker and returns at once.
+        """
+        self._queue.put((description, category))
+
+    def _run(self):
+        next_update = 0.0
+        while not self._stopping.is_set():
+            try:
+                corrections = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                corrections = []
+            while True:
+                try:
+                    corrections.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._lock:
+                for description, category in corrections:
+                    self._accept(description, category)
+                if len(self._pending) < self.batch_size or time.monotonic() < next_update:
+                    continue
+                batch, self._pending = self._pending, []
+                try:
+                    updated = self._update(batch)
+                except Exception as e:
+                    print(f"Online update on {len(batch)} corrections failed: {e}")
+                    continue
+
+            next_update = time.monotonic() + self.min_interval
+            if self.on_update is not None:
+                try:
+                    self.on_update(updated)
+                except Exception as e:
+                    print(f"Swapping in online update {updated.version} failed: {e}")
+
+    def flush(self):
+        """
+        Applies whatever is pending, even if it is less than a mini-batch.
+        """
+        with self._lock:
+            if not self._pending:
+                return None
+            batch, self._pending = self._pending, []
+            return self._update(batch)
+
+    def _update(self, batch):
+        start = time.perf_counter()
+
+        pipeline = copy.deepcopy(self.classifier.pipeline)
+        texts = [description for description, _ in batch]
+        labels = [category for _, category in batch]
+        features = pipeline.named_steps['tfidf'].transform(texts)
+        pipeline.named_steps['clf'].partial_fit(features, labels)
+
+        self.updates += 1
+        self.samples += len(batch)
+
+        updated = TransactionClassifier(self.classifier.vectorizer, self.classifier.estimator)
+        updated.pipeline = pipeline
+        updated.version = f"{self.base_version}+{self.updates}"
+        self.classifier = updated
+
+        self.last_update_seconds = time.perf_counter() - start
+        return updated
+
+    def stats(self):
+        return {
+            "base_version": self.base_version,
+            "version": self.classifier.version,
+            "batch_size": self.batch_size,
+            "pending": len(self._pending) + self._queue.qsize(),
+            "min_interval": self.min_interval,
+            "updates": self.updates,
+            "samples": self.samples,
+            "skipped": self.skipped,
+            "last_update_ms": self.last_update_seconds * 1000 if self.last_update_seconds is not None else None,
+        }
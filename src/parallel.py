@@ -0,0 +1,27 @@
+import os
+from collections import deque
+
+def map_ordered(fn, tasks, workers=None, initializer=None, initargs=()):
+    """
+    Ordered map of `fn` over `tasks` in `workers` processes (None = all
+    cores, 1 = in-process), each set up with `initializer(*initargs)`.
+    At most two tasks per worker are in flight, so neither the input nor
+    the results pile up when the consumer is slower than the pool, unlike
+    with Pool.imap.
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(fn, tasks)
+        return
+
+    from multiprocessing import Pool
+    with Pool(workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(fn, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
@@ -1,6 +1,12 @@
-import re
 import string
 
+# Built once at import instead of on every call
+PUNCTUATION_TABLE = str.maketrans(string.punctuation, ' ' * len(string.punctuation))
+
+# Joins a batch into one string so lower/translate run once per batch. It is
+# neither whitespace nor punctuation, so normalization leaves it untouched.
+BATCH_SEPARATOR = "\x00"
+
 def normalize_text(text):
     """
     Normalizes transaction description text.
@@ -10,20 +16,47 @@ def normalize_text(text):
     """
     if not isinstance(text, str):
         return ""
-    
-    text = text.lower()
+
     # Replace punctuation with space
-    text = text.translate(str.maketrans(string.punctuation, ' ' * len(string.punctuation)))
+    text = text.lower().translate(PUNCTUATION_TABLE)
     # Remove digits (optional, depending on if numbers are useful like store IDs, but usually noise)
-    # text = re.sub(r'\d+', '', text) 
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
+    # text = re.sub(r'\d+', '', text)
+    # Remove extra whitespace (split() without arguments also strips)
+    return ' '.join(text.split())
+
+def normalize_batch(texts):
+    """
+    Normalizes a list (or pandas Series) of descriptions, same output as
+    calling normalize_text on each element. Lowercasing and punctuation
+    removal are done on the whole batch at once.
+    """
+    # Iterating a pandas Series element by element is much slower than a list
+    if hasattr(texts, "tolist"):
+        texts = texts.tolist()
+    texts = [text if isinstance(text, str) else "" for text in texts]
+    if not texts:
+        return []
+
+    joined = BATCH_SEPARATOR.join(texts).lower().translate(PUNCTUATION_TABLE)
+    parts = joined.split(BATCH_SEPARATOR)
+    if len(parts) != len(texts):
+        # A description contained the separator itself
+        return [normalize_text(text) for text in texts]
+
+    return [' '.join(part.split()) for part in parts]
 
 def preprocess_dataframe(df, text_column="description"):
     """
     Applies normalization to a dataframe column.
     """
-    df[f"clean_{text_column}"] = df[text_column].apply(normalize_text)
+    df[f"clean_{text_column}"] = normalize_batch(df[text_column])
     return df
+
+def __getattr__(name):
+    # NormalizingTfidfVectorizer lives in src.vectorizer so that importing this
+    # module does not pull in sklearn; models pickled while it was defined here
+    # still resolve it through this module
+    if name == "NormalizingTfidfVectorizer":
+        from src.vectorizer import NormalizingTfidfVectorizer
+        return NormalizingTfidfVectorizer
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
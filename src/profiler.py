@@ -0,0 +1,83 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on and off in a running
+    server. While running, a background thread snapshots every other
+    thread's Python stack every `interval` seconds and counts identical
+    stacks. Nothing is hooked into the profiled code, so it costs nothing
+    when stopped and only the sampling thread's time when running.
+
+    report() returns the counts in collapsed-stack format ("outer;inner
+    count" per line), which flamegraph.pl and speedscope read directly.
+    """
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self.started_at = None
+        self.stopped_at = None
+        self._stacks = Counter()
+        self._thread = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        with self._lock:
+            if self._thread is not None:
+                return False
+            if interval is not None:
+                self.interval = interval
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at, self.stopped_at = time.time(), None
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        with self._lock:
+            if self._thread is None:
+                return False
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            self.stopped_at = time.time()
+            return True
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def report(self, limit=None):
+        # Copied first (atomic for a dict), the sampler may still be adding
+        stacks = Counter(self._stacks).most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
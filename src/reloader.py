@@ -0,0 +1,73 @@
+import os
+import threading
+
+def fingerprint(path):
+    """
+    Identifies the current content of a model file, a memory-mapped export
+    directory (through its meta.json, which is written last) or a config
+    file. Symlinks are resolved, so repointing one counts as a change.
+    """
+    real = os.path.realpath(path)
+    target = os.path.join(real, "meta.json") if os.path.isdir(real) else real
+    try:
+        stat = os.stat(target)
+    except OSError:
+        return None
+    return real, stat.st_mtime_ns, stat.st_size
+
+class Reloader:
+    """
+    Polls watched paths every `interval` seconds on a background thread and
+    calls the path's callback when its fingerprint changes. Callbacks do the
+    slow work (loading, warming up) on this thread, so serving threads only
+    ever see the finished swap. A failing callback, e.g. on a file caught
+    mid-write, is reported and retried on the next change.
+    """
+    def __init__(self, interval=5.0):
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._watches = {}
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def watch(self, path, callback):
+        self._watches[path] = [fingerprint(path), callback]
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        """
+        Runs the callbacks of every changed path once. Returns the paths
+        that were reloaded.
+        """
+        reloaded = []
+        for path, watch in self._watches.items():
+            current = fingerprint(path)
+            if current is None or current == watch[0]:
+                continue
+            watch[0] = current
+            try:
+                watch[1]()
+            except Exception as e:
+                self.failures += 1
+                print(f"Reloading {path} failed, keeping the current version: {e}")
+                continue
+            self.reloads += 1
+            reloaded.append(path)
+        return reloaded
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.check()
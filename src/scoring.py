@@ -0,0 +1,210 @@
+"""
+Compiled scoring kernel for the linear classifier head.
+
+ScoringKernel replaces clf.predict_proba on the serving path. The
+coefficients are stored once as a contiguous float32 (features x classes)
+matrix, and features whose weights are all within `prune` of zero can be
+dropped from it. Each call accumulates the CSR rows straight into one
+preallocated output buffer that already holds the intercepts, using SciPy's
+compiled CSR kernel, and applies the softmax (or the one-vs-rest
+normalization of SGDClassifier) in place. sklearn's input validation and
+temporary arrays are skipped.
+
+calibrate() picks the largest pruning threshold that keeps probabilities
+within a tolerance of the exact model on sample data.
+
+Usage:
+    python -m src.scoring --tolerance 1e-4
+"""
+import argparse
+import time
+import numpy as np
+
+try:
+    # Computes Y += A @ X for a CSR matrix A into an existing Y
+    from scipy.sparse._sparsetools import csr_matvecs
+except ImportError:
+    csr_matvecs = None
+
+def _check_csr_matvecs():
+    """
+    csr_matvecs is private to SciPy, so it is checked against the public
+    sparse product once on import; a changed signature or result raises
+    here instead of producing wrong scores.
+    """
+    import scipy.sparse as sp
+    for dtype in (np.float32, np.float64):
+        A = sp.random(5, 7, density=0.4, format="csr", dtype=dtype, random_state=0)
+        X = np.arange(21, dtype=dtype).reshape(7, 3)
+        Y = np.ones((5, 3), dtype=dtype)
+        try:
+            csr_matvecs(5, 7, 3, A.indptr.astype(np.int32), A.indices.astype(np.int32), A.data, X.ravel(), Y.ravel())
+        except Exception as e:
+            raise RuntimeError(f"scipy.sparse._sparsetools.csr_matvecs is not usable: {e}") from e
+        if not np.allclose(Y, 1 + A @ X, rtol=1e-5):
+            raise RuntimeError("scipy.sparse._sparsetools.csr_matvecs disagrees with the sparse matrix product")
+
+if csr_matvecs is not None:
+    _check_csr_matvecs()
+
+class ScoringKernel:
+    def __init__(self, classifier, dtype=np.float32, prune=0.0):
+        coef = np.asarray(classifier.coef_, dtype=np.float64)
+        self.classes_ = classifier.classes_
+        self.dtype = np.dtype(dtype)
+        self.prune = prune
+        self.n_features = coef.shape[1]
+        # SGDClassifier (and its exported runtime) normalizes one-vs-rest
+        # sigmoids, LogisticRegression uses the softmax
+        self.ovr = getattr(classifier, "ovr", type(classifier).__name__ == "SGDClassifier")
+
+        # Features no class weighs more than `prune` are not stored; their
+        # columns map to a single all-zero row at the end, so rows never
+        # need filtering
+        keep = np.abs(coef).max(axis=0) > prune
+        self.columns = None
+        weights = coef[:, keep].T
+        if not keep.all():
+            self.columns = np.full(self.n_features, keep.sum(), dtype=np.int32)
+            self.columns[keep] = np.arange(keep.sum(), dtype=np.int32)
+            weights = np.vstack([weights, np.zeros(coef.shape[0])])
+        self.weights = np.ascontiguousarray(weights, dtype=self.dtype)
+        self.intercept = np.asarray(classifier.intercept_, dtype=self.dtype)
+
+    @property
+    def nbytes(self):
+        return self.weights.nbytes + self.intercept.nbytes + (self.columns.nbytes if self.columns is not None else 0)
+
+    @property
+    def kept_features(self):
+        return self.weights.shape[0] - (self.columns is not None)
+
+    def decision_function(self, X, out=None):
+        """
+        Scores of a CSR matrix, written into `out` (a C-contiguous
+        (rows, classes) array of the kernel's dtype) if given.
+        """
+        n_rows, n_classes = X.shape[0], self.weights.shape[1]
+        if out is None:
+            out = np.empty((n_rows, n_classes), dtype=self.dtype)
+        elif out.shape != (n_rows, n_classes) or out.dtype != self.dtype or not out.flags.c_contiguous:
+            # The kernel writes through out.ravel(), which would be a copy
+            raise ValueError(f"out must be a C-contiguous {self.dtype} array of shape {(n_rows, n_classes)}")
+        out[:] = self.intercept
+
+        indices = X.indices if self.columns is None else self.columns[X.indices]
+        data = X.data.astype(self.dtype, copy=False)
+        n_columns = self.weights.shape[0]
+
+        if csr_matvecs is None:
+            import scipy.sparse as sp
+            out += sp.csr_matrix((data, indices, X.indptr), shape=(n_rows, n_columns)) @ self.weights
+        else:
+            csr_matvecs(n_rows, n_columns, n_classes, X.indptr.astype(np.int32, copy=False),
+                        indices.astype(np.int32, copy=False), data, self.weights.ravel(), out.ravel())
+        return out
+
+    def predict_proba(self, X, out=None):
+        scores = self.decision_function(X, out)
+        if scores.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1 - positive, positive])
+
+        if self.ovr:
+            # Same steps as sklearn's _predict_proba_lr
+            np.negative(scores, scores)
+            np.exp(scores, scores)
+            scores += 1
+            np.reciprocal(scores, scores)
+        else:
+            scores -= scores.max(axis=1, keepdims=True)
+            np.exp(scores, scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def compare(kernel, classifier, X):
+    """
+    How far the kernel's probabilities on X are from the exact classifier's.
+    """
+    exact = classifier.predict_proba(X)
+    approx = kernel.predict_proba(X)
+    return {
+        "max_abs_diff": float(np.abs(exact - approx).max()) if len(exact) else 0.0,
+        "label_agreement": float((exact.argmax(axis=1) == approx.argmax(axis=1)).mean()) if len(exact) else 1.0,
+    }
+
+def calibrate(classifier, X, tolerance=1e-4, dtype=np.float32, steps=20):
+    """
+    The kernel with the largest pruning threshold whose probabilities on X
+    stay within `tolerance` of the classifier's, found by bisection over
+    the features' sorted largest absolute weights. If even the
+    unpruned kernel misses the tolerance in `dtype`, a float64 kernel is
+    returned. Returns (kernel, comparison).
+    """
+    kernel = ScoringKernel(classifier, dtype)
+    result = compare(kernel, classifier, X)
+    if result["max_abs_diff"] > tolerance:
+        kernel = ScoringKernel(classifier, np.float64)
+        return kernel, compare(kernel, classifier, X)
+
+    weights = np.sort(np.abs(np.asarray(classifier.coef_)).max(axis=0))
+    low, high = 0, len(weights) - 1
+    best, best_result = kernel, result
+    for _ in range(steps):
+        if low > high:
+            break
+        middle = (low + high) // 2
+        candidate = ScoringKernel(classifier, dtype, prune=float(weights[middle]))
+        candidate_result = compare(candidate, classifier, X)
+        if candidate_result["max_abs_diff"] <= tolerance:
+            best, best_result = candidate, candidate_result
+            low = middle + 1
+        else:
+            high = middle - 1
+    return best, best_result
+
+def _best_ms(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate the scoring kernel and report memory, latency and accuracy.")
+    parser.add_argument("--model", default="models/model.pkl", help="Model file or export")
+    parser.add_argument("--data", default="data/transactions.csv", help="CSV with a 'description' column")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows to calibrate and time on")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Largest allowed probability difference")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    from src.model import TransactionClassifier
+    from src.preprocessing import normalize_batch
+
+    classifier = TransactionClassifier()
+    classifier.load_model(args.model)
+    clf = classifier.pipeline.named_steps['clf']
+    texts = normalize_batch(pd.read_csv(args.data, nrows=args.rows, usecols=["description"])["description"])
+    X = classifier.pipeline.named_steps['tfidf'].transform(texts)
+
+    kernel, result = calibrate(clf, X, args.tolerance)
+    exact_bytes = np.asarray(clf.coef_).nbytes + np.asarray(clf.intercept_).nbytes
+    print(f"tolerance:        {args.tolerance:g}")
+    print(f"dtype / prune:    {kernel.dtype} / {kernel.prune:g} (keeps {kernel.kept_features:,} of {kernel.n_features:,} features)")
+    print(f"max |p - exact|:  {result['max_abs_diff']:.2e}")
+    print(f"label agreement:  {result['label_agreement']:.4%}")
+    print(f"weights memory:   {exact_bytes / 1024:,.1f} KB -> {kernel.nbytes / 1024:,.1f} KB")
+    print(f"\n{'rows':>8} {'predict_proba':>15} {'kernel':>12} {'speedup':>8}")
+    for size in (1, 100, len(texts)):
+        batch = X[:size]
+        exact_ms = _best_ms(lambda: clf.predict_proba(batch))
+        kernel_ms = _best_ms(lambda: kernel.predict_proba(batch))
+        print(f"{size:>8,} {exact_ms:>12.3f} ms {kernel_ms:>9.3f} ms {exact_ms / kernel_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
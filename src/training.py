@@ -0,0 +1,171 @@
+"""
+Out-of-core training and background reporting.
+
+train_out_of_core streams the training data in chunks and never holds more
+than a few of them in memory. Hashed character n-grams give a fixed feature
+space, so the IDF is fitted from document frequencies summed over one pass,
+and a log-loss SGDClassifier learns with partial_fit over one or more
+further passes. The dominant cost, hashing n-grams, runs in a pool of worker
+processes while the main process reads the next chunks and runs
+partial_fit, whose one-vs-rest binary problems are spread over threads.
+
+start_report renders the confusion matrix and logs it, and the model, to
+MLflow on a background thread, so neither path waits on plotting.
+"""
+import os
+import threading
+import numpy as np
+from src.parallel import map_ordered
+
+_vectorizer = None
+
+def _init_worker(vectorizer):
+    global _vectorizer
+    _vectorizer = vectorizer
+
+def _document_frequencies(task):
+    texts, labels = task
+    return len(texts), _vectorizer.document_frequencies(texts), np.unique(np.array(labels, dtype=str))
+
+def _transform(task):
+    texts, labels = task
+    return _vectorizer.transform(texts), labels
+
+def read_training_chunks(data_path, chunk_size=100000, feedback_path=None):
+    """
+    Yields (descriptions, categories) lists of at most `chunk_size` rows from
+    a CSV or Parquet file (needs pyarrow), then the FeedbackStore
+    corrections if any.
+    """
+    if data_path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet input requires pyarrow: pip install pyarrow, or train from a CSV file")
+        for batch in pq.ParquetFile(data_path).iter_batches(chunk_size, columns=["description", "category"]):
+            yield batch.column("description").to_pylist(), batch.column("category").to_pylist()
+    else:
+        import pandas as pd
+        for chunk in pd.read_csv(data_path, chunksize=chunk_size, usecols=["description", "category"], dtype=str):
+            yield chunk["description"].fillna("").tolist(), chunk["category"].tolist()
+
+    if feedback_path and os.path.exists(feedback_path):
+        from src.feedback import FeedbackStore
+        rows = FeedbackStore(feedback_path).read()
+        for start in range(0, len(rows), chunk_size):
+            batch = rows[start:start + chunk_size]
+            yield [row[1] for row in batch], [row[2] for row in batch]
+
+def _split(chunks, test_size, seed):
+    """
+    Splits each chunk into ((train texts, labels), (test texts, labels)).
+    The split is drawn identically on every pass over the data.
+    """
+    rng = np.random.default_rng(seed)
+    for texts, labels in chunks:
+        test = rng.random(len(texts)) < test_size
+        parts = []
+        for keep in (np.flatnonzero(~test), np.flatnonzero(test)):
+            parts.append(([texts[i] for i in keep], [labels[i] for i in keep]))
+        yield parts
+
+def classification_summary(cm, classes):
+    """
+    Accuracy and per-class / macro precision, recall and F1 from a confusion
+    matrix, in the layout of classification_report(output_dict=True).
+    """
+    tp = np.diag(cm).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(tp / cm.sum(axis=0))
+        recall = np.nan_to_num(tp / cm.sum(axis=1))
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+
+    report = {
+        name: {"precision": p, "recall": r, "f1-score": f, "support": int(s)}
+        for name, p, r, f, s in zip(classes, precision, recall, f1, cm.sum(axis=1))
+    }
+    report["accuracy"] = tp.sum() / max(cm.sum(), 1)
+    report["macro avg"] = {
+        "precision": precision.mean(), "recall": recall.mean(), "f1-score": f1.mean(), "support": int(cm.sum())
+    }
+    return report
+
+def train_out_of_core(pipeline, data_path, test_size=0.2, chunk_size=100000, epochs=1,
+                      workers=None, feedback_path=None, seed=42):
+    """
+    Fits a hashing + SGD pipeline on `data_path` in chunks, evaluates it on
+    the held-out rows and returns (confusion_matrix, classes).
+    workers: featurization processes (None = all cores, 1 = in-process).
+    """
+    vectorizer = pipeline.named_steps['tfidf']
+    clf = pipeline.named_steps['clf']
+    workers = workers or os.cpu_count()
+
+    def split():
+        return _split(read_training_chunks(data_path, chunk_size, feedback_path), test_size, seed)
+
+    print("Fitting IDF...")
+    n_samples, df, classes = 0, np.zeros(vectorizer.n_features, dtype=np.int64), set()
+    # partial_fit needs every category up front, including any that only
+    # occur in held-out rows
+    tasks = ((train[0], train[1] + test[1]) for train, test in split())
+    for n, chunk_df, chunk_classes in map_ordered(_document_frequencies, tasks, workers, _init_worker, (vectorizer,)):
+        n_samples += n
+        df += chunk_df
+        classes.update(chunk_classes.tolist())
+    vectorizer.fit_document_frequencies(n_samples, df)
+    classes = np.array(sorted(classes))
+
+    for epoch in range(epochs):
+        print(f"Training epoch {epoch + 1}/{epochs} on {n_samples:,} rows...")
+        for features, labels in map_ordered(_transform, (train for train, _ in split()), workers, _init_worker, (vectorizer,)):
+            if len(labels):
+                clf.partial_fit(features, labels, classes=classes)
+
+    print("Evaluating model...")
+    cm = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    for features, labels in map_ordered(_transform, (test for _, test in split()), workers, _init_worker, (vectorizer,)):
+        if not len(labels):
+            continue
+        actual = np.searchsorted(classes, labels)
+        predicted = np.searchsorted(classes, clf.predict(features))
+        cm += np.bincount(actual * len(classes) + predicted, minlength=cm.size).reshape(cm.shape)
+
+    return cm, classes
+
+def _write_report(run_id, cm, classes, pipeline, path):
+    import mlflow
+    import mlflow.sklearn
+    from matplotlib.figure import Figure
+    import seaborn as sns
+
+    try:
+        # pyplot is not thread-safe; a bare Figure is
+        fig = Figure(figsize=(10, 8))
+        ax = fig.subplots()
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=classes, yticklabels=classes, ax=ax)
+        ax.set_title('Confusion Matrix')
+        ax.set_ylabel('Actual')
+        ax.set_xlabel('Predicted')
+        fig.tight_layout()
+        fig.savefig(path)
+
+        with mlflow.start_run(run_id=run_id):
+            mlflow.log_artifact(path)
+            # Pickle-based like models/model.pkl; newer MLflow defaults to
+            # skops, which rejects the pipeline's own vectorizer classes
+            mlflow.sklearn.log_model(pipeline, "model", serialization_format="cloudpickle")
+    except Exception as e:
+        print(f"Failed to write the training report: {e}")
+
+def start_report(run_id, cm, classes, pipeline, path="confusion_matrix.png"):
+    """
+    Writes the confusion matrix plot and logs it and the model to the MLflow
+    run `run_id` on a background thread. The thread is not a daemon, so the
+    process still waits for it before exiting.
+    """
+    thread = threading.Thread(
+        target=_write_report, args=(run_id, cm, list(classes), pipeline, path), name="training-report"
+    )
+    thread.start()
+    return thread
@@ -0,0 +1,83 @@
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, TfidfVectorizer
+from src.preprocessing import normalize_batch
+
+class NormalizingTfidfVectorizer(TfidfVectorizer):
+    """
+    TfidfVectorizer that runs normalize_batch over the whole input up front
+    instead of calling normalize_text as a per-document preprocessor.
+    """
+    def fit(self, raw_documents, y=None):
+        return super().fit(normalize_batch(raw_documents), y)
+
+    def fit_transform(self, raw_documents, y=None):
+        return super().fit_transform(normalize_batch(raw_documents), y)
+
+    def transform(self, raw_documents):
+        return super().transform(normalize_batch(raw_documents))
+
+class HashingTfidfVectorizer(TransformerMixin, BaseEstimator):
+    """
+    TF-IDF over hashed character n-grams. Every description maps into a
+    fixed `n_features`-column space, so there is no vocabulary to grow, store
+    or look up; only the IDF vector is learned.
+    """
+    def __init__(self, n_features=2 ** 16, ngram_range=(3, 5), norm="l2", sublinear_tf=False):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+
+    def _hasher(self):
+        return HashingVectorizer(
+            analyzer="char_wb", ngram_range=self.ngram_range, n_features=self.n_features,
+            alternate_sign=False, norm=None, lowercase=False
+        )
+
+    def count(self, raw_documents):
+        """
+        Raw n-gram counts of normalized documents (no IDF, no normalization).
+        """
+        return self._hasher().transform(normalize_batch(raw_documents))
+
+    def fit(self, raw_documents, y=None):
+        self.idf_transformer_ = TfidfTransformer(norm=self.norm, sublinear_tf=self.sublinear_tf)
+        self.idf_transformer_.fit(self.count(raw_documents))
+        return self
+
+    def fit_transform(self, raw_documents, y=None):
+        counts = self.count(raw_documents)
+        self.idf_transformer_ = TfidfTransformer(norm=self.norm, sublinear_tf=self.sublinear_tf)
+        return self.idf_transformer_.fit_transform(counts)
+
+    def document_frequencies(self, raw_documents):
+        """
+        Number of documents containing each hashed n-gram, for fitting the IDF
+        out of core with fit_document_frequencies().
+        """
+        counts = self.count(raw_documents)
+        return np.bincount(counts.indices, minlength=self.n_features)
+
+    def fit_document_frequencies(self, n_samples, df):
+        """
+        Fits the IDF from document frequencies summed over chunks of a dataset
+        too large to vectorize at once. Gives the same idf_ as fit() on all of
+        those documents.
+        """
+        self.idf_transformer_ = TfidfTransformer(norm=self.norm, sublinear_tf=self.sublinear_tf)
+        # Same smoothing as TfidfTransformer.fit
+        idf = np.full(self.n_features, n_samples + 1, dtype=np.float64)
+        idf /= np.asarray(df, dtype=np.float64) + 1.0
+        np.log(idf, out=idf)
+        idf += 1.0
+        self.idf_transformer_.idf_ = idf
+        self.idf_transformer_.n_features_in_ = self.n_features
+        return self
+
+    def transform(self, raw_documents):
+        return self.idf_transformer_.transform(self.count(raw_documents))
+
+    @property
+    def idf_(self):
+        return self.idf_transformer_.idf_
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from src.explainability import Explainer
+from src.model import TransactionClassifier
+
+TEXTS = [
+    "starbucks coffee", "mcdonalds burger", "uber trip", "lyft ride",
+    "netflix subscription", "spotify premium", "walmart groceries", "amazon order",
+]
+LABELS = ["Dining", "Dining", "Transport", "Transport", "Entertainment", "Entertainment", "Shopping", "Shopping"]
+QUERIES = [
+    "STARBUCKS COFFEE #1234", "uber trip to airport", "amazon prime order",
+    "netflix premium", "lyft coffee", "unknown merchant", "",
+]
+
+def fit_explainer(estimator, labels):
+    classifier = TransactionClassifier(estimator=estimator)
+    classifier.pipeline = classifier.build_pipeline()
+    classifier.pipeline.fit(TEXTS, labels)
+    return Explainer(pipeline=classifier.pipeline)
+
+@pytest.mark.parametrize("estimator", ["logistic", "sgd"])
+@pytest.mark.parametrize("labels", [LABELS, ["Dining", "Other"] * 4], ids=["multiclass", "binary"])
+def test_linear_attribution_matches_shap(estimator, labels):
+    explainer = fit_explainer(estimator, labels)
+    for text in QUERIES:
+        fast = explainer.explain(text)
+        ref = explainer.explain_shap(text)
+        assert [e["word"] for e in fast] == [e["word"] for e in ref], text
+        np.testing.assert_allclose([e["score"] for e in fast], [e["score"] for e in ref], atol=1e-9, err_msg=text)
+
+def test_explain_batch_matches_explain():
+    explainer = fit_explainer("logistic", LABELS)
+    assert explainer.explain_batch(QUERIES, top_k=3) == [explainer.explain(text, top_k=3) for text in QUERIES]
@@ -0,0 +1,60 @@
+import threading
+import time
+from src.model import TransactionClassifier
+
+TEXTS = [
+    "starbucks coffee", "mcdonalds burger", "uber trip", "lyft ride",
+    "netflix subscription", "spotify premium", "walmart groceries", "amazon order",
+]
+LABELS = ["Dining", "Dining", "Transport", "Transport", "Entertainment", "Entertainment", "Shopping", "Shopping"]
+
+def fit_model(path, seed):
+    classifier = TransactionClassifier(estimator="sgd")
+    classifier.pipeline = classifier.build_pipeline()
+    classifier.pipeline.named_steps['clf'].set_params(random_state=seed)
+    classifier.pipeline.fit(TEXTS, LABELS)
+    classifier.save_model(str(path))
+
+def test_concurrent_reload_and_online_swaps(tmp_path, monkeypatch):
+    import app.main as api
+
+    paths = [tmp_path / "a.pkl", tmp_path / "b.pkl"]
+    for seed, path in enumerate(paths):
+        fit_model(path, seed)
+    monkeypatch.setattr(api, "ONLINE_LEARNING", True)
+    monkeypatch.setattr(api, "ONLINE_BATCH_SIZE", 1)
+    monkeypatch.setattr(api, "ONLINE_UPDATE_INTERVAL", 0.0)
+    monkeypatch.setattr(api, "MODEL_PATH", str(paths[0]))
+    api.reload_model()
+
+    def reload():
+        for i in range(1, 21):
+            api.MODEL_PATH = str(paths[i % 2])
+            api.reload_model()
+            time.sleep(0.01)
+
+    def feedback():
+        for i in range(400):
+            api.online_learner.submit(TEXTS[i % len(TEXTS)], LABELS[(i + 2) % len(LABELS)])
+            time.sleep(0.001)
+
+    threads = [threading.Thread(target=reload), threading.Thread(target=feedback)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    learner = api.online_learner
+    deadline = time.monotonic() + 10
+    while learner.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    learner.stop()
+    monkeypatch.setattr(api, "online_learner", None)
+
+    model, _ = api.serving
+    assert api.classifier is model
+    assert api.prediction_cache.version == model.version
+    # Either the deployed model or an online update made from it, never an
+    # update of a model that was already replaced
+    assert model.version.split("+")[0] == api.versions["model"]
+    assert learner.updates > 0